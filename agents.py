@@ -1,97 +1,113 @@
 from crewai import Agent
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import functools
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 
-# Initialize Gemini LLM
-def get_gemini_llm():
+# Static agent prompts keyed by agent name. These are built once at import and reused
+# verbatim for every agent instance, so the role/goal/backstory prefix Gemini sees is
+# byte-identical across calls and pipeline runs.
+AGENT_PROFILES = {
+    "spamfilter": {
+        "role": "Spam Filter Expert",
+        "goal": "Analyze text content to identify spam, advertisements, newsletters, and inappropriate content.",
+        "backstory": """You are an expert spam filter with years of experience analyzing online content. 
+            You have a keen eye for identifying advertisements, promotional content, newsletters, and vulgar language. 
+            You take pride in maintaining clean, appropriate discussion spaces.""",
+    },
+    "analyst": {
+        "role": "Discussion Analyst",
+        "goal": "Extract and organize key arguments and positions from discussion participants while preserving the essence of their contributions.",
+        "backstory": """You are an expert discussion analyst with expertise in identifying different voices 
+            and perspectives in conversations. You excel at distilling complex discussions into clear, 
+            organized summaries while maintaining the integrity of each participant's viewpoint.""",
+    },
+    "scriptwriter": {
+        "role": "Script Writer",
+        "goal": "Transform analyzed discussions into natural, engaging movie-style dialogue that captures the essence of the conversation.",
+        "backstory": """You are a professional scriptwriter with expertise in creating natural, 
+            flowing dialogue for films. You focus purely on spoken words and avoid any stage directions, 
+            actions, or parentheticals. Your dialogue sounds authentic and engaging.""",
+    },
+    "formatter": {
+        "role": "Text Formatter",
+        "goal": "Clean and format text to professional standards, removing unwanted elements while maintaining readability.",
+        "backstory": """You are a meticulous text formatter with an eye for clean, professional presentation. 
+            You excel at removing extraneous elements like stage directions and formatting artifacts 
+            while preserving the core content.""",
+    },
+    "scorer": {
+        "role": "Dialogue Quality Assessor",
+        "goal": """Score dialogue quality on 10 dimensions, each an integer from 1 (poor) to 10 (excellent):
+            clarity, relevance, conciseness, politeness, engagement, flow, coherence,
+            responsiveness, language_use, emotional_intelligence.
+            Respond only with a JSON object mapping each dimension to its score.""",
+        "backstory": """You are an expert dialogue assessor with extensive experience evaluating 
+            conversational quality across multiple dimensions. You have a keen analytical mind and 
+            can identify both strengths and areas for improvement in any dialogue exchange.""",
+    },
+}
+
+GEMINI_MODEL = "gemini-1.5-flash"
+GEMINI_LIGHT_MODEL = "gemini-1.5-flash-8b"  # Spam filtering and formatting don't need the full model
+GEMINI_EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Initialize Gemini LLM - one shared client per configuration, reused by every crew
+@functools.lru_cache(maxsize=None)
+def get_gemini_llm(model_name: str = GEMINI_MODEL, temperature: float = 0.7):
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY environment variable is not set")
     
     return ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
+        model=model_name,
         google_api_key=api_key,
-        temperature=0.7
+        temperature=temperature
+    )
+
+def agent_preamble(name: str) -> str:
+    """Agent persona as a prompt prefix, for stages that call the LLM without a crew"""
+    profile = AGENT_PROFILES[name]
+    return f"You are {profile['role']}. {profile['backstory']}\nYour personal goal is: {profile['goal']}"
+
+# Initialize Gemini embeddings (used by the semantic cache)
+@functools.lru_cache(maxsize=1)
+def get_gemini_embeddings():
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY environment variable is not set")
+    
+    return GoogleGenerativeAIEmbeddings(
+        model=GEMINI_EMBEDDING_MODEL,
+        google_api_key=api_key
     )
 
 class NewsGroupAgents:
     def __init__(self):
         self.llm = get_gemini_llm()
+        # Spam filtering and scoring run at temperature 0 so their responses are cacheable
+        self.deterministic_llm = get_gemini_llm(temperature=0.0)
+        # Low-complexity stages (spam filter, formatter) use the smaller, faster model
+        self.light_llm = get_gemini_llm(GEMINI_LIGHT_MODEL, temperature=0.0)
     
-    def spamfilter_agent(self):
+    def _build_agent(self, name: str, llm=None) -> Agent:
+        profile = AGENT_PROFILES[name]
         return Agent(
-            role="Spam Filter Expert",
-            goal="Analyze text content to identify spam, advertisements, newsletters, and inappropriate content.",
-            backstory="""You are an expert spam filter with years of experience analyzing online content. 
-            You have a keen eye for identifying advertisements, promotional content, newsletters, and vulgar language. 
-            You take pride in maintaining clean, appropriate discussion spaces.""",
+            role=profile["role"],
+            goal=profile["goal"],
+            backstory=profile["backstory"],
             verbose=True,
             allow_delegation=False,
-            llm=self.llm
+            llm=llm or self.llm
         )
     
+    def spamfilter_agent(self):
+        return self._build_agent("spamfilter", self.light_llm)
+    
     def analyst_agent(self):
-        return Agent(
-            role="Discussion Analyst",
-            goal="Extract and organize key arguments and positions from discussion participants while preserving the essence of their contributions.",
-            backstory="""You are an expert discussion analyst with expertise in identifying different voices 
-            and perspectives in conversations. You excel at distilling complex discussions into clear, 
-            organized summaries while maintaining the integrity of each participant's viewpoint.""",
-            verbose=True,
-            allow_delegation=False,
-            llm=self.llm
-        )
+        return self._build_agent("analyst")
     
     def scriptwriter_agent(self):
-        return Agent(
-            role="Script Writer",
-            goal="Transform analyzed discussions into natural, engaging movie-style dialogue that captures the essence of the conversation.",
-            backstory="""You are a professional scriptwriter with expertise in creating natural, 
-            flowing dialogue for films. You focus purely on spoken words and avoid any stage directions, 
-            actions, or parentheticals. Your dialogue sounds authentic and engaging.""",
-            verbose=True,
-            allow_delegation=False,
-            llm=self.llm
-        )
-    
-    def formatter_agent(self):
-        return Agent(
-            role="Text Formatter",
-            goal="Clean and format text to professional standards, removing unwanted elements while maintaining readability.",
-            backstory="""You are a meticulous text formatter with an eye for clean, professional presentation. 
-            You excel at removing extraneous elements like stage directions and formatting artifacts 
-            while preserving the core content.""",
-            verbose=True,
-            allow_delegation=False,
-            llm=self.llm
-        )
+        return self._build_agent("scriptwriter")
     
     def scorer_agent(self):
-        return Agent(
-            role="Dialogue Quality Assessor",
-            goal="""Evaluate dialogue quality on a 1-10 scale across multiple dimensions:
-            
-            SCORING CRITERIA:
-            • Clarity (1-10): How clear and understandable is the exchange?
-            • Relevance (1-10): Do responses stay on topic and contribute meaningfully?
-            • Conciseness (1-10): Is the dialogue free of unnecessary redundancy?
-            • Politeness (1-10): Are participants respectful and considerate?
-            • Engagement (1-10): Do participants seem interested and involved?
-            • Flow (1-10): Is there natural progression without awkward transitions?
-            • Coherence (1-10): Does the dialogue make logical sense overall?
-            • Responsiveness (1-10): Do participants address each other's points adequately?
-            • Language Use (1-10): Is grammar, vocabulary, and syntax appropriate?
-            • Emotional Intelligence (1-10): Are participants sensitive to emotional tone?
-            
-            SCALE INTERPRETATION:
-            1-3: Poor - Significant issues preventing effective communication
-            4-6: Average - Some good points but notable weaknesses
-            7-9: Good - Mostly effective with minor issues
-            10: Excellent - Exemplary with no apparent issues""",
-            backstory="""You are an expert dialogue assessor with extensive experience evaluating 
-            conversational quality across multiple dimensions. You have a keen analytical mind and 
-            can identify both strengths and areas for improvement in any dialogue exchange.""",
-            verbose=True,
-            allow_delegation=False,
-            llm=self.llm
-        )
\ No newline at end of file
+        return self._build_agent("scorer", self.deterministic_llm)
\ No newline at end of file
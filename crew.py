@@ -1,45 +1,75 @@
+import os
+import asyncio
+import json
+import re
+import functools
+from datetime import datetime
 from crewai import Crew, Process
-from agents import NewsGroupAgents
-from tasks import NewsGroupTasks
-from tools import TextProcessor, LoggingTools, ValidationTools, FileManager
-from typing import Dict, Any, Optional
+from agents import NewsGroupAgents, GEMINI_MODEL, GEMINI_LIGHT_MODEL, get_gemini_embeddings, agent_preamble
+from tasks import NewsGroupTasks, MAX_BATCH_SIZE, SPAM_CACHE_STAGE
+from tools import TextProcessor, LoggingTools, ValidationTools, FileManager, LLMCache, SpamHeuristic, DialogueStreamCleaner, PROMPT_TOKEN_BUDGET
+from typing import Dict, Any, Optional, List, Callable
+
+# Spam filter verdict keyword, matched case-insensitively without copying the response
+_STOP_RE = re.compile(r"\bSTOP\b", re.IGNORECASE)
 
 class NewsGroupCrew:
-    def __init__(self, discussion_content: str):
+    def __init__(self, discussion_content: str, llm_cache: Optional[LLMCache] = None,
+                 agents: Optional[NewsGroupAgents] = None, spam_cache: Optional[LLMCache] = None):
         self.discussion_content = discussion_content
         self.agents = None
         self.tasks = None
         self.text_processor = TextProcessor()
         self.file_manager = FileManager()
+        self.llm_cache = llm_cache or LLMCache()
+        # Spam verdicts are deterministic, so they can have a longer-lived cache of their own
+        self.spam_cache = spam_cache or self.llm_cache
+        self.embeddings = None  # Created on first semantic cache lookup
         
         # Initialize agents and tasks with error handling
         try:
-            self.agents = NewsGroupAgents()
+            # Agents (and their LLM clients) can be shared between crews, e.g. in batch runs
+            self.agents = agents or NewsGroupAgents()
             self.tasks = NewsGroupTasks(discussion_content)
             LoggingTools.log_step("INITIALIZATION", "NewsGroupCrew initialized successfully")
         except Exception as e:
             LoggingTools.log_error(f"Failed to initialize crew: {str(e)}", "Initialization")
             raise
     
-    def run_spam_filter(self) -> bool:
+    def run_spam_filter(self, verdict: Optional[str] = None) -> bool:
         """Run spam filter check and return True if content should be processed"""
         LoggingTools.log_step("SPAM FILTER", "Checking for spam and inappropriate content")
         
+        # Reject obvious spam locally; everything else needs the spam filter agent
+        verdict = verdict or SpamHeuristic.classify(self.discussion_content)
+        if verdict == SpamHeuristic.CLEARLY_SPAM:
+            print("❌ Content filtered out by spam heuristics")
+            LoggingTools.log_step("SPAM FILTER RESULT", "Content REJECTED - flagged by local heuristics")
+            return False
+        
+        LoggingTools.log_step("SPAM HEURISTICS", "No obvious spam - falling back to spam filter agent")
+        
         try:
-            spamfilter_agent = self.agents.spamfilter_agent()
-            spam_task = self.tasks.spam_filter_task(spamfilter_agent)
-            
-            LoggingTools.log_step("SPAM FILTER EXECUTION", "Running spam filter analysis")
-            result = spam_task.execute()
+            result = self.spam_cache.get(SPAM_CACHE_STAGE, GEMINI_LIGHT_MODEL, self.discussion_content)
             
-            if not ValidationTools.validate_agent_response(str(result), "Spam Filter Agent"):
-                LoggingTools.log_error("Spam filter returned invalid response", "Spam Filter")
-                return False
+            if result is not None:
+                LoggingTools.log_step("SPAM FILTER CACHE", "Using cached spam filter verdict")
+            else:
+                spamfilter_agent = self.agents.spamfilter_agent()
+                spam_task = self.tasks.spam_filter_task(spamfilter_agent)
+                
+                LoggingTools.log_step("SPAM FILTER EXECUTION", "Running spam filter analysis")
+                result = spam_task.execute()
+                
+                if not ValidationTools.validate_agent_response(str(result), "Spam Filter Agent"):
+                    LoggingTools.log_error("Spam filter returned invalid response", "Spam Filter")
+                    return False
+                
+                self.spam_cache.set(SPAM_CACHE_STAGE, GEMINI_LIGHT_MODEL, self.discussion_content, str(result))
             
-            result_str = str(result).upper()
-            LoggingTools.log_result("Spam Filter Result", str(result))
+            LoggingTools.log_result("Spam Filter Result", result)
             
-            if "STOP" in result_str:
+            if _STOP_RE.search(str(result)):
                 print("❌ Content filtered out by spam filter")
                 LoggingTools.log_step("SPAM FILTER RESULT", "Content REJECTED - flagged as inappropriate")
                 return False
@@ -53,42 +83,140 @@ class NewsGroupCrew:
             print(f"❌ Spam filter error: {str(e)}")
             return False
     
-    def run_dialogue_transformation(self) -> Optional[str]:
-        """Run the main crew to transform discussion into dialogue"""
-        LoggingTools.log_step("DIALOGUE TRANSFORMATION", "Starting crew processing pipeline")
+    async def run_participant_analysis(self, analyst, speakers: List[str]) -> str:
+        """Analyze each participant concurrently and combine the per-speaker analyses"""
+        if len(speakers) < 2:
+            # Too few recurring "Name:" speakers to split on (a one-turn participant would be left
+            # out of every per-speaker analysis) - analyze the discussion as a whole
+            crew = Crew(
+                agents=[analyst],
+                tasks=[self.tasks.analysis_task(analyst)],
+                verbose=2,
+                process=Process.sequential
+            )
+            return str(await crew.kickoff_async())
+        
+        crew = Crew(
+            agents=[analyst],
+            tasks=[self.tasks.speaker_analysis_task(analyst)],
+            verbose=2,
+            process=Process.sequential
+        )
+        results = await crew.kickoff_for_each_async(inputs=[
+            {"speaker": speaker, "discussion_content": self.discussion_content}
+            for speaker in speakers
+        ])
+        
+        return "\n\n".join(
+            f"PARTICIPANT: {speaker}\n{str(result).strip()}"
+            for speaker, result in zip(speakers, results)
+        )
+    
+    async def stream_formatted_dialogue(self, script: str, output_filename: Optional[str] = None) -> str:
+        """Stream the formatter's output through the incremental cleaner, writing it out as it arrives"""
+        prompt = agent_preamble("formatter") + "\n" + self.tasks.formatting_prompt(script)
+        cleaner = DialogueStreamCleaner()
+        pieces = []
         
+        # Written to a temporary file that replaces output_filename only once the whole dialogue
+        # arrived and isn't empty, so a failed stream never clobbers an earlier result
+        output_file = self.file_manager.open_result_stream(output_filename) if output_filename else None
         try:
-            # Create agents
-            LoggingTools.log_step("AGENT CREATION", "Initializing transformation agents")
+            async for chunk in self.agents.light_llm.astream(prompt):
+                pieces.append(cleaner.feed(str(chunk.content)))
+                if output_file:
+                    output_file.write(pieces[-1])
+            
+            pieces.append(cleaner.close())
+            result = "".join(pieces)
+            if output_file:
+                output_file.write(pieces[-1])
+                if result.strip():
+                    self.file_manager.commit_result_stream(output_file, output_filename)
+                    output_file = None
+        finally:
+            if output_file:
+                self.file_manager.discard_result_stream(output_file)
+        
+        return result
+    
+    async def run_analysis(self) -> Optional[str]:
+        """Run the analyst over the discussion and return the validated analysis"""
+        if TextProcessor.count_tokens(self.discussion_content) > PROMPT_TOKEN_BUDGET:
+            analysis = await self.run_chunked_analysis()
+        else:
             analyst = self.agents.analyst_agent()
-            scriptwriter = self.agents.scriptwriter_agent()
-            formatter = self.agents.formatter_agent()
             
-            # Create tasks
-            LoggingTools.log_step("TASK CREATION", "Setting up transformation tasks")
-            analysis_task = self.tasks.analysis_task(analyst)
-            script_task = self.tasks.scriptwriting_task(scriptwriter)
-            format_task = self.tasks.formatting_task(formatter)
+            # Fan out analysis across participants - the per-speaker calls are independent
+            speakers = self.text_processor.extract_speakers(self.discussion_content)
+            LoggingTools.log_step("PARTICIPANT ANALYSIS", "Analyzing %d participants concurrently", len(speakers))
+            analysis = await self.run_participant_analysis(analyst, speakers)
+        
+        if not ValidationTools.validate_agent_response(analysis, "Analyst Agent"):
+            LoggingTools.log_error("Analyst returned invalid response", "Dialogue Transformation")
+            return None
+        
+        LoggingTools.log_result("Participant Analysis", analysis)
+        return analysis
+    
+    async def run_chunked_analysis(self) -> str:
+        """Map-reduce analysis for discussions over the token budget: analyze chunks concurrently, then merge"""
+        chunks = TextProcessor.split_to_budget(self.discussion_content)
+        LoggingTools.log_step("CHUNKED ANALYSIS", "Discussion over %d tokens - analyzing %d chunks concurrently",
+                              PROMPT_TOKEN_BUDGET, len(chunks))
+        
+        preamble = agent_preamble("analyst") + "\n"
+        partials = await asyncio.gather(*[
+            self.agents.llm.ainvoke(preamble + NewsGroupTasks.chunk_analysis_description(chunk, part, len(chunks)))
+            for part, chunk in enumerate(chunks, 1)
+        ])
+        
+        merged = await self.agents.llm.ainvoke(
+            preamble + NewsGroupTasks.merge_analysis_description([str(partial.content) for partial in partials])
+        )
+        return str(merged.content)
+    
+    async def run_dialogue_transformation(self, output_filename: Optional[str] = None,
+                                          analysis_task: Optional[asyncio.Task] = None) -> Optional[str]:
+        """Run the main crew to transform discussion into dialogue, saving it to output_filename if given"""
+        LoggingTools.log_step("DIALOGUE TRANSFORMATION", "Starting crew processing pipeline")
+        
+        cached_result = self.llm_cache.get("dialogue", GEMINI_MODEL, self.discussion_content)
+        if cached_result is not None:
+            if analysis_task is not None:
+                analysis_task.cancel()
+            LoggingTools.log_step("DIALOGUE CACHE", "Using cached dialogue transformation")
+            if output_filename:
+                await self.file_manager.save_result_async(cached_result, output_filename)
+            return cached_result
+        
+        try:
+            # The analysis may already be running, started speculatively alongside the spam filter
+            analysis = await (analysis_task or self.run_analysis())
+            if analysis is None:
+                return None
             
-            # Create and run crew
-            LoggingTools.log_step("CREW EXECUTION", "Running sequential processing crew")
+            # Scriptwriting depends on the combined analysis
+            LoggingTools.log_step("AGENT CREATION", "Initializing scriptwriter agent")
+            scriptwriter = self.agents.scriptwriter_agent()
+            LoggingTools.log_step("CREW EXECUTION", "Running scriptwriting crew")
             crew = Crew(
-                agents=[analyst, scriptwriter, formatter],
-                tasks=[analysis_task, script_task, format_task],
+                agents=[scriptwriter],
+                tasks=[self.tasks.scriptwriting_task(scriptwriter)],
                 verbose=2,
                 process=Process.sequential
             )
             
-            result = crew.kickoff()
+            script = await crew.kickoff_async(inputs={"analysis": analysis})
             
             # Validate crew result
-            if not ValidationTools.validate_crew_result(result):
+            if not ValidationTools.validate_crew_result(script):
                 LoggingTools.log_error("Crew returned invalid result", "Dialogue Transformation")
                 return None
             
-            # Clean the result
-            LoggingTools.log_step("RESULT CLEANING", "Cleaning and formatting final output")
-            cleaned_result = self.text_processor.clean_dialogue(str(result))
+            # Format and clean the script as it streams back, so the raw output is never held in full
+            LoggingTools.log_step("RESULT FORMATTING", "Streaming formatted and cleaned output")
+            cleaned_result = await self.stream_formatted_dialogue(str(script), output_filename)
             
             if not cleaned_result.strip():
                 LoggingTools.log_error("Cleaned result is empty", "Dialogue Transformation")
@@ -97,6 +225,8 @@ class NewsGroupCrew:
             LoggingTools.log_result("Dialogue Transformation Result", cleaned_result)
             print("✅ Dialogue transformation completed successfully")
             
+            self.llm_cache.set("dialogue", GEMINI_MODEL, self.discussion_content, cleaned_result)
+            
             return cleaned_result
             
         except Exception as e:
@@ -113,19 +243,31 @@ class NewsGroupCrew:
             return "0"
         
         try:
-            scorer_agent = self.agents.scorer_agent()
-            scoring_task = self.tasks.scoring_task(scorer_agent, dialogue_result)
-            
-            LoggingTools.log_step("SCORE EXECUTION", "Running quality assessment")
-            score_result = scoring_task.execute()
+            scores = self.llm_cache.get("score", GEMINI_MODEL, dialogue_result)
             
-            if not ValidationTools.validate_agent_response(str(score_result), "Scorer Agent"):
-                LoggingTools.log_error("Scorer returned invalid response", "Scoring")
-                return "0"
+            if scores is not None:
+                LoggingTools.log_step("SCORE CACHE", "Using cached quality assessment")
+            else:
+                scorer_agent = self.agents.scorer_agent()
+                scoring_task = self.tasks.scoring_task(scorer_agent, dialogue_result)
+                
+                LoggingTools.log_step("SCORE EXECUTION", "Running quality assessment")
+                score_result = scoring_task.execute()
+                
+                if not ValidationTools.validate_agent_response(str(score_result), "Scorer Agent"):
+                    LoggingTools.log_error("Scorer returned invalid response", "Scoring")
+                    return "0"
+                
+                scores = self.text_processor.parse_scores(str(score_result))
+                if scores is None:
+                    LoggingTools.log_error("Scorer returned invalid JSON scores", "Scoring")
+                    return "0"
+                
+                self.llm_cache.set("score", GEMINI_MODEL, dialogue_result, scores)
             
-            score = self.text_processor.extract_score(str(score_result))
+            score = self.overall_score(scores)
             
-            LoggingTools.log_result("Scoring Result", f"Score: {score}/10\nDetails: {str(score_result)}")
+            LoggingTools.log_result("Scoring Result", f"Score: {score}/10\nDetails: {json.dumps(scores)}")
             print(f"✅ Dialogue scored: {score}/10")
             
             return score
@@ -135,9 +277,43 @@ class NewsGroupCrew:
             print(f"❌ Scoring error: {str(e)}")
             return "0"
     
-    def process_discussion(self, save_output: bool = True, save_logs: bool = True) -> Dict[str, Any]:
-        """Complete processing pipeline for newsgroup discussion"""
+    @staticmethod
+    def overall_score(scores: Optional[Dict[str, int]]) -> str:
+        """Overall score is the mean of the per-dimension scores ("0" if there are none)"""
+        return f"{sum(scores.values()) / len(scores):.1f}" if scores else "0"
+    
+    async def semantic_cache_lookup(self):
+        """Embed the discussion and look up a cached result from a near-duplicate discussion"""
+        try:
+            if self.embeddings is None:
+                self.embeddings = get_gemini_embeddings()
+            embedding = await asyncio.to_thread(self.embeddings.embed_query, self.discussion_content)
+        except Exception as e:
+            LoggingTools.log_error(f"Could not embed discussion: {str(e)}", "Semantic Cache")
+            return None, None
+        
+        return embedding, self.llm_cache.semantic_lookup(embedding)
+    
+    async def process_discussion(self, save_output: bool = True, save_logs: bool = True,
+                                 enable_semantic_cache: bool = False, score: bool = True) -> Dict[str, Any]:
+        """Complete processing pipeline for newsgroup discussion; score=False skips the scorer ("score": "N/A")"""
         LoggingTools.clear_log()  # Start with fresh log
+        LoggingTools.enabled = save_logs  # Nothing to buffer if the log won't be saved
+        
+        result = await self._run_pipeline(save_output, enable_semantic_cache, score)
+        
+        if enable_semantic_cache:
+            await asyncio.to_thread(self.llm_cache.save_semantic_index)
+        
+        # Save logs if requested
+        if save_logs:
+            await asyncio.to_thread(LoggingTools.save_log_to_file, self.file_manager)
+        
+        return result
+    
+    async def _run_pipeline(self, save_output: bool, enable_semantic_cache: bool,
+                            run_scoring: bool = True) -> Dict[str, Any]:
+        """Run validation, filtering, transformation and scoring for this crew's discussion"""
         LoggingTools.log_step("PIPELINE START", "Beginning complete discussion processing")
         
         # Validate environment
@@ -149,95 +325,134 @@ class NewsGroupCrew:
         
         # Validate discussion content
         LoggingTools.log_step("CONTENT VALIDATION", "Checking discussion content quality")
-        if not TextProcessor.validate_discussion_content(self.discussion_content):
-            error_msg = "Invalid or insufficient discussion content (minimum 100 characters, meaningful content required)"
+        # Structural checks are local, so unusable content never costs an LLM call
+        issue = TextProcessor.content_issue(self.discussion_content)
+        if issue is not None:
+            error_msg = f"Invalid or insufficient discussion content: {TextProcessor.CONTENT_ISSUE_MESSAGES[issue]}"
             LoggingTools.log_error(error_msg, "Content Validation")
-            return {"error": error_msg}
+            return {"error": error_msg, "reason": issue}
         
         LoggingTools.log_result("Input Discussion Content", self.discussion_content, 300)
         
+        # The dialogue is written as it streams in; the score file is written at the end
+        dialogue_file = "dialogue_output.txt" if save_output else None
+        
         try:
-            # Step 1: Spam filter
-            LoggingTools.log_step("STEP 1", "Spam and content filtering")
-            if not self.run_spam_filter():
-                result = {
-                    "status": "filtered",
-                    "message": "Content was filtered out by spam filter"
-                }
-                LoggingTools.log_result("Final Result", str(result))
-                if save_logs:
-                    LoggingTools.save_log_to_file(self.file_manager)
-                return result
-            
-            # Step 2: Transform to dialogue
-            LoggingTools.log_step("STEP 2", "Discussion to dialogue transformation")
-            dialogue_result = self.run_dialogue_transformation()
+            # Reuse the result of a near-duplicate discussion when possible
+            embedding, cached = None, None
+            if enable_semantic_cache:
+                LoggingTools.log_step("SEMANTIC CACHE", "Looking up similar processed discussions")
+                embedding, cached = await self.semantic_cache_lookup()
             
-            if not dialogue_result:
-                error_msg = "Dialogue transformation failed - no output generated"
-                LoggingTools.log_error(error_msg, "Processing Pipeline")
-                if save_logs:
-                    LoggingTools.save_log_to_file(self.file_manager)
-                return {"error": error_msg}
-            
-            # Step 3: Score the result
-            LoggingTools.log_step("STEP 3", "Quality assessment and scoring")
-            score = self.score_dialogue(dialogue_result)
+            if cached is not None:
+                LoggingTools.log_step("SEMANTIC CACHE HIT", "Reusing result from a similar discussion")
+                dialogue_result, score = cached["dialogue"], cached["score"]
+                
+                if not run_scoring:
+                    score = "N/A"
+                elif score == "N/A":
+                    # The similar discussion was processed without scoring
+                    score = await asyncio.to_thread(self.score_dialogue, dialogue_result)
+                    self.llm_cache.semantic_store(embedding, {"dialogue": dialogue_result, "score": score})
+            else:
+                # Step 1: Spam filter
+                LoggingTools.log_step("STEP 1", "Spam and content filtering")
+                verdict = SpamHeuristic.classify(self.discussion_content)
+                
+                # Content the heuristics don't reject waits on the spam filter agent; start the
+                # analysis alongside it and throw it away if the content is rejected
+                analysis_task = None
+                if (verdict == SpamHeuristic.UNCERTAIN
+                        and not self.llm_cache.contains("dialogue", GEMINI_MODEL, self.discussion_content)):
+                    LoggingTools.log_step("SPECULATIVE ANALYSIS", "Starting analysis alongside the spam filter")
+                    analysis_task = asyncio.create_task(self.run_analysis())
+                
+                if not await asyncio.to_thread(self.run_spam_filter, verdict):
+                    if analysis_task is not None:
+                        analysis_task.cancel()
+                    result = {
+                        "status": "filtered",
+                        "message": "Content was filtered out by spam filter"
+                    }
+                    LoggingTools.log_result("Final Result", result)
+                    return result
+                
+                # Step 2: Transform to dialogue
+                LoggingTools.log_step("STEP 2", "Discussion to dialogue transformation")
+                dialogue_result = await self.run_dialogue_transformation(dialogue_file, analysis_task)
+                
+                if not dialogue_result:
+                    error_msg = "Dialogue transformation failed - no output generated"
+                    LoggingTools.log_error(error_msg, "Processing Pipeline")
+                    return {"error": error_msg}
+                
+                # Step 3: Score the result, unless the caller only wants the dialogue
+                if run_scoring:
+                    LoggingTools.log_step("STEP 3", "Quality assessment and scoring")
+                    score = await asyncio.to_thread(self.score_dialogue, dialogue_result)
+                else:
+                    LoggingTools.log_step("STEP 3", "Scoring skipped")
+                    score = "N/A"
+                
+                if embedding is not None:
+                    self.llm_cache.semantic_store(embedding, {"dialogue": dialogue_result, "score": score})
             
             # Save output if requested
             if save_output:
                 LoggingTools.log_step("FILE OPERATIONS", "Saving results to files")
                 
-                # Save dialogue
-                dialogue_saved = self.file_manager.save_result(dialogue_result, "dialogue_output.txt")
-                
-                # Save score with details
-                score_content = f"Dialogue Quality Score: {score}/10\n\n"
-                score_content += f"Generated on: {LoggingTools._log_buffer[0] if LoggingTools._log_buffer else 'Unknown'}\n\n"
-                score_content += "DIALOGUE CONTENT:\n"
-                score_content += "=" * 50 + "\n"
-                score_content += dialogue_result
-                
-                score_saved = self.file_manager.save_result(score_content, "dialogue_score.txt")
+                saves = []
+                if run_scoring:
+                    # Save score with details
+                    score_content = f"Dialogue Quality Score: {score}/10\n\n"
+                    started_at = LoggingTools.first_timestamp()
+                    generated_on = datetime.fromtimestamp(started_at) if started_at else datetime.now()
+                    score_content += f"Generated on: {generated_on.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                    score_content += "DIALOGUE CONTENT:\n"
+                    score_content += "=" * 50 + "\n"
+                    score_content += dialogue_result
+                    
+                    saves.append(self.file_manager.save_result_async(score_content, "dialogue_score.txt"))
+                if cached is not None:
+                    # Streamed dialogue is already on disk; a reused result is not
+                    saves.append(self.file_manager.save_result_async(dialogue_result, dialogue_file))
                 
-                if not (dialogue_saved and score_saved):
+                if saves and not all(await asyncio.gather(*saves)):
                     LoggingTools.log_error("Some files failed to save", "File Operations")
             
-            # Save logs if requested
-            if save_logs:
-                LoggingTools.save_log_to_file(self.file_manager)
-            
-            # Prepare final result
-            result = {
-                "status": "success",
-                "dialogue": dialogue_result,
-                "score": score,
-                "message": f"Successfully processed discussion with score: {score}/10",
-                "stats": {
-                    "original_length": len(self.discussion_content),
-                    "processed_length": len(dialogue_result),
-                    "files_saved": save_output
-                }
-            }
-            
-            LoggingTools.log_step("PIPELINE COMPLETE", f"Processing successful - Score: {score}/10")
-            LoggingTools.log_result("Final Result", str(result))
-            
-            return result
+            return self._success_result(dialogue_result, score, run_scoring, save_output)
             
         except Exception as e:
             error_msg = f"Error during processing pipeline: {str(e)}"
             LoggingTools.log_error(error_msg, "Processing Pipeline")
             print(f"❌ {error_msg}")
-            
-            if save_logs:
-                LoggingTools.save_log_to_file(self.file_manager)
-            
             return {"error": error_msg}
     
-    def process_from_file(self, filename: str, save_output: bool = True, save_logs: bool = True) -> Dict[str, Any]:
+    def _success_result(self, dialogue_result: str, score: str, run_scoring: bool,
+                        files_saved: bool) -> Dict[str, Any]:
+        """Build and log the final result of a successfully processed discussion"""
+        result = {
+            "status": "success",
+            "dialogue": dialogue_result,
+            "score": score,
+            "message": f"Successfully processed discussion with score: {score}/10" if run_scoring
+                       else "Successfully processed discussion (scoring skipped)",
+            "stats": {
+                "original_length": len(self.discussion_content),
+                "processed_length": len(dialogue_result),
+                "files_saved": files_saved
+            }
+        }
+        
+        LoggingTools.log_step("PIPELINE COMPLETE", "Processing successful - Score: %s", score)
+        LoggingTools.log_result("Final Result", result)
+        
+        return result
+    
+    async def process_from_file(self, filename: str, save_output: bool = True, save_logs: bool = True,
+                                enable_semantic_cache: bool = False, score: bool = True) -> Dict[str, Any]:
         """Process discussion from a file"""
-        LoggingTools.log_step("FILE PROCESSING", f"Loading discussion from file: {filename}")
+        LoggingTools.log_step("FILE PROCESSING", "Loading discussion from file: %s", filename)
         
         # Load discussion content
         discussion_content = self.file_manager.load_discussion_from_file(filename)
@@ -251,7 +466,271 @@ class NewsGroupCrew:
         self.discussion_content = discussion_content
         self.tasks = NewsGroupTasks(discussion_content)  # Reinitialize tasks with new content
         
-        return self.process_discussion(save_output, save_logs)
+        return await self.process_discussion(save_output, save_logs, enable_semantic_cache, score)
+    
+    async def process_discussions_batch(self, contents: List[str], max_concurrency: int = 8,
+                                        save_logs: bool = True, enable_semantic_cache: bool = False,
+                                        score: bool = True, save_output: bool = False) -> List[Dict[str, Any]]:
+        """Process many discussions through staged workers, at most max_concurrency of them in an LLM step at once"""
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        
+        LoggingTools.clear_log()  # One log for the whole batch
+        LoggingTools.enabled = save_logs
+        LoggingTools.log_step("BATCH START", "Processing %d discussions (max %d concurrent)", len(contents), max_concurrency)
+        
+        if enable_semantic_cache and self.embeddings is None:
+            self.embeddings = get_gemini_embeddings()
+        
+        # Checked once for the whole batch rather than per discussion
+        if not ValidationTools.validate_environment():
+            error_msg = "Environment validation failed - check API keys"
+            LoggingTools.log_error(error_msg, "Environment")
+            results = [{"error": error_msg} for _ in contents]
+        else:
+            await self.prefilter_spam_batch(contents)
+            
+            # In batch mode scores come from one offline Gemini Batch Mode job after all pipelines finish
+            offline_scoring = score and os.getenv("NEWSGROUP_BATCH_MODE") == "1"
+            
+            jobs = [{"content": content, "save_as": f"dialogue_output_{index}.txt" if save_output else None}
+                    for index, content in enumerate(contents, 1)]
+            await self._run_stages(jobs, [
+                functools.partial(self._filter_stage, enable_semantic_cache=enable_semantic_cache),
+                self._transform_stage,
+                functools.partial(self._score_stage, run_scoring=score, defer_scoring=offline_scoring),
+            ], max_concurrency)
+            results = [job["result"] for job in jobs]
+            
+            if offline_scoring:
+                await self.score_batch_offline(results, max_concurrency)
+            
+            if enable_semantic_cache:
+                await asyncio.to_thread(self.llm_cache.save_semantic_index)
+        
+        succeeded = sum(1 for result in results if result.get("status") == "success")
+        LoggingTools.log_step("BATCH COMPLETE", "%d/%d discussions processed successfully", succeeded, len(results))
+        
+        if save_logs:
+            await asyncio.to_thread(LoggingTools.save_log_to_file, self.file_manager)
+        
+        return results
+    
+    async def score_batch_offline(self, results: List[Dict[str, Any]], max_concurrency: int = 8):
+        """Score a batch's unscored dialogues through a Gemini Batch Mode job, filling in each result's score"""
+        # Results the semantic cache already scored keep their score; the hash cache covers the rest it can
+        pending = []
+        for result in results:
+            if result.get("status") != "success" or result["score"] != "N/A":
+                continue
+            scores = self.llm_cache.get("score", GEMINI_MODEL, result["dialogue"])
+            if scores is None:
+                pending.append(result)
+            else:
+                self._set_score(result, self.overall_score(scores))
+        if not pending:
+            return
+        
+        LoggingTools.log_step("BATCH SCORING", "Submitting %d dialogues to Gemini Batch Mode", len(pending))
+        try:
+            job_name = await NewsGroupTasks.scoring_task_batch_submit([result["dialogue"] for result in pending])
+            LoggingTools.log_step("BATCH SCORING", "Waiting for batch job %s", job_name)
+            all_scores = await NewsGroupTasks.scoring_task_batch_collect(job_name)
+        except ImportError:
+            # Without google-genai, score through the regular scorer instead
+            LoggingTools.log_step("BATCH SCORING", "google-genai not installed, scoring %d dialogues directly", len(pending))
+            semaphore = asyncio.Semaphore(max_concurrency)
+            
+            async def score(result: Dict[str, Any]):
+                async with semaphore:
+                    self._set_score(result, await asyncio.to_thread(self.score_dialogue, result["dialogue"]))
+            
+            await asyncio.gather(*[score(result) for result in pending])
+            return
+        except Exception as e:
+            LoggingTools.log_error(f"Batch scoring failed: {str(e)}", "Batch Scoring")
+            all_scores = [None] * len(pending)
+        
+        for result, scores in zip(pending, all_scores):
+            if scores is None:
+                # No fake 0 score when the job (or this dialogue's entry) failed
+                result["message"] = "Processed discussion, but batch scoring failed"
+                continue
+            self.llm_cache.set("score", GEMINI_MODEL, result["dialogue"], scores)
+            self._set_score(result, self.overall_score(scores))
+    
+    @staticmethod
+    def _set_score(result: Dict[str, Any], score: str):
+        result["score"] = score
+        result["message"] = f"Successfully processed discussion with score: {score}/10"
+    
+    async def prefilter_spam_batch(self, contents: List[str]):
+        """Spam-check a batch's uncertain discussions in packed prompts, caching verdicts for the pipelines"""
+        pending = list(dict.fromkeys(
+            content for content in contents
+            if TextProcessor.content_issue(content) is None
+            and SpamHeuristic.classify(content) == SpamHeuristic.UNCERTAIN
+            and NewsGroupTasks.fits_spam_batch(content)
+            and not self.spam_cache.contains(SPAM_CACHE_STAGE, GEMINI_LIGHT_MODEL, content)
+        ))
+        if not pending:
+            return
+        
+        LoggingTools.log_step("BATCH SPAM FILTER", "Checking %d discussions, %d per call", len(pending), MAX_BATCH_SIZE)
+        verdicts = await NewsGroupTasks.spam_filter_batch(self.agents.spamfilter_agent(), pending)
+        
+        # run_spam_filter picks these up from the cache; discussions without a verdict, or too long
+        # to pack whole, get their own call
+        for content, verdict in zip(pending, verdicts):
+            if verdict is not None:
+                self.spam_cache.set(SPAM_CACHE_STAGE, GEMINI_LIGHT_MODEL, content, verdict)
+    
+    async def _run_stages(self, jobs: List[Dict[str, Any]], stages: List[Callable], max_concurrency: int):
+        """Stream batch jobs through the stages, each drained by its own workers over a bounded queue"""
+        # One slot per discussion inside an LLM-calling step, shared by all stages. A slot is not
+        # one call: a transformation makes a call per speaker (or per chunk), then the scriptwriter
+        # and formatter calls, all under the same slot
+        semaphore = asyncio.Semaphore(max_concurrency)
+        queues = [asyncio.Queue(maxsize=max_concurrency) for _ in stages]
+        outboxes = queues[1:] + [None]
+        workers = [
+            [asyncio.create_task(self._stage_worker(stage, semaphore, inbox, outbox)) for _ in range(max_concurrency)]
+            for stage, inbox, outbox in zip(stages, queues, outboxes)
+        ]
+        
+        for job in jobs:
+            await queues[0].put(job)
+        
+        # Close the stages in order: once a stage's workers exit, nothing more reaches the next one
+        for queue, stage_workers in zip(queues, workers):
+            for _ in stage_workers:
+                await queue.put(None)
+            await asyncio.gather(*stage_workers)
+    
+    @staticmethod
+    async def _stage_worker(stage: Callable, semaphore: asyncio.Semaphore, inbox: asyncio.Queue,
+                            outbox: Optional[asyncio.Queue]):
+        """Run jobs from inbox through one stage, passing unfinished ones on, until a None arrives"""
+        while True:
+            job = await inbox.get()
+            if job is None:
+                return
+            
+            try:
+                await stage(job, semaphore)
+            except Exception as e:
+                error_msg = f"Error during processing pipeline: {str(e)}"
+                LoggingTools.log_error(error_msg, "Processing Pipeline")
+                job["result"] = {"error": error_msg}
+            
+            # A stage finishes a job early by giving it a result (filtered, invalid or failed)
+            if "result" not in job and outbox is not None:
+                await outbox.put(job)
+    
+    async def _filter_stage(self, job: Dict[str, Any], semaphore: asyncio.Semaphore, enable_semantic_cache: bool):
+        """Batch stage 1: validate the discussion, look it up in the semantic cache and spam-filter it"""
+        crew = NewsGroupCrew(job["content"], llm_cache=self.llm_cache, agents=self.agents, spam_cache=self.spam_cache)
+        crew.embeddings = self.embeddings
+        job["crew"] = crew
+        
+        # Structural checks are local, so unusable content never takes a slot
+        issue = TextProcessor.content_issue(crew.discussion_content)
+        if issue is not None:
+            error_msg = f"Invalid or insufficient discussion content: {TextProcessor.CONTENT_ISSUE_MESSAGES[issue]}"
+            LoggingTools.log_error(error_msg, "Content Validation")
+            job["result"] = {"error": error_msg, "reason": issue}
+            return
+        
+        if enable_semantic_cache:
+            async with semaphore:
+                job["embedding"], cached = await crew.semantic_cache_lookup()
+            if cached is not None:
+                LoggingTools.log_step("SEMANTIC CACHE HIT", "Reusing result from a similar discussion")
+                job["dialogue"], job["score"] = cached["dialogue"], cached["score"]
+                return
+        
+        async with semaphore:
+            approved = await asyncio.to_thread(crew.run_spam_filter)
+        if not approved:
+            job["result"] = {
+                "status": "filtered",
+                "message": "Content was filtered out by spam filter"
+            }
+            LoggingTools.log_result("Final Result", job["result"])
+    
+    async def _transform_stage(self, job: Dict[str, Any], semaphore: asyncio.Semaphore):
+        """Batch stage 2: turn an approved discussion into dialogue"""
+        if "dialogue" in job:  # Reused from the semantic cache
+            return
+        
+        async with semaphore:
+            dialogue_result = await job["crew"].run_dialogue_transformation()
+        
+        if not dialogue_result:
+            error_msg = "Dialogue transformation failed - no output generated"
+            LoggingTools.log_error(error_msg, "Processing Pipeline")
+            job["result"] = {"error": error_msg}
+            return
+        
+        job["dialogue"] = dialogue_result
+    
+    async def _score_stage(self, job: Dict[str, Any], semaphore: asyncio.Semaphore, run_scoring: bool,
+                           defer_scoring: bool = False):
+        """Batch stage 3: score the dialogue, record the result and write the dialogue file"""
+        crew, dialogue_result = job["crew"], job["dialogue"]
+        cached_score = job.get("score")
+        
+        if not run_scoring:
+            score = "N/A"
+        elif cached_score is not None and cached_score != "N/A":
+            score = cached_score
+        elif defer_scoring:
+            score = "N/A"  # Filled in by score_batch_offline once all pipelines finish
+        else:
+            async with semaphore:
+                score = await asyncio.to_thread(crew.score_dialogue, dialogue_result)
+        
+        # Store new results, and cached ones that were only just scored
+        if job.get("embedding") is not None and (cached_score is None or (run_scoring and score != cached_score)):
+            self.llm_cache.semantic_store(job["embedding"], {"dialogue": dialogue_result, "score": score})
+        
+        job["result"] = crew._success_result(dialogue_result, score, run_scoring, False)
+        
+        # Written outside the semaphore, so other discussions' LLM calls overlap this write
+        if job["save_as"]:
+            await self.file_manager.save_result_async(dialogue_result, job["save_as"])
+    
+    async def process_batch_file(self, filename: str, max_concurrency: int = 8, save_output: bool = True,
+                                 save_logs: bool = True, enable_semantic_cache: bool = False,
+                                 score: bool = True) -> List[Dict[str, Any]]:
+        """Process a JSONL file with one discussion per line ({"content": ...} or a JSON string)"""
+        LoggingTools.log_step("BATCH FILE PROCESSING", "Loading discussions from file: %s", filename)
+        
+        batch_content = self.file_manager.load_discussion_from_file(filename)
+        if not batch_content:
+            LoggingTools.log_error(f"Could not load batch file: {filename}", "Batch Processing")
+            return []
+        
+        contents = []
+        for line_number, line in enumerate(batch_content.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                LoggingTools.log_error(f"Skipping invalid JSON on line {line_number}: {str(e)}", "Batch Processing")
+                continue
+            contents.append(entry.get("content", "") if isinstance(entry, dict) else str(entry))
+        
+        results = await self.process_discussions_batch(contents, max_concurrency, save_logs, enable_semantic_cache,
+                                                       score, save_output)
+        
+        if save_output and results:
+            await self.file_manager.save_result_async(
+                "\n".join(json.dumps(result) for result in results), "batch_results.jsonl"
+            )
+        
+        return results
     
     def get_processing_summary(self) -> Dict[str, Any]:
         """Get summary of the current processing setup"""
@@ -261,6 +740,8 @@ class NewsGroupCrew:
             "environment_valid": ValidationTools.validate_environment(),
             "agents_initialized": self.agents is not None,
             "tasks_initialized": self.tasks is not None,
+            "cache": self.llm_cache.stats(),
+            "spam_cache": self.spam_cache.stats(),
             "output_directory": str(self.file_manager.output_dir),
             "logs_directory": str(self.file_manager.logs_dir)
         }
\ No newline at end of file
@@ -12,14 +12,24 @@ Usage:
     python main.py
     python main.py --file discussion.txt
     python main.py --no-save
+    python main.py --cache
+    python main.py --no-score
+    python main.py --batch-file discussions.jsonl
 """
 
 import os
 import sys
+import asyncio
 import argparse
 from pathlib import Path
+from dotenv import load_dotenv
+
+# Load .env before importing crew and tools: they read settings such as PROMPT_TOKEN_BUDGET
+# and MAX_BATCH_SIZE at import. Variables already set in the environment take precedence
+load_dotenv()
+
 from crew import NewsGroupCrew
-from tools import LoggingTools, ValidationTools
+from tools import LoggingTools, ValidationTools, LLMCache, FileCacheBackend, setup_console_logging
 
 # Sample discussion for demo purposes
 SAMPLE_DISCUSSION = """
@@ -45,38 +55,38 @@ Sarah: I understand that, but I worry we're compromising away our children's fut
 """
 
 def setup_environment():
-    """Setup environment variables if not already set"""
+    """Report missing environment variables (.env is loaded at import)"""
     if not os.getenv("GOOGLE_API_KEY"):
         print("⚠️  GOOGLE_API_KEY not found in environment")
         print("💡 You can:")
         print("   1. Set it as an environment variable")
         print("   2. Create a .env file with GOOGLE_API_KEY=your_key_here")
         print("   3. Set it temporarily for this session")
-        
-        # Try to load from .env file
-        env_file = Path(".env")
-        if env_file.exists():
-            print("📁 Found .env file, loading...")
-            try:
-                with open(env_file, 'r') as f:
-                    for line in f:
-                        if line.strip() and not line.startswith('#'):
-                            key, value = line.strip().split('=', 1)
-                            os.environ[key] = value
-                print("✅ Environment variables loaded from .env")
-            except Exception as e:
-                print(f"❌ Error loading .env file: {e}")
-
-def main():
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+async def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Process newsgroup discussions into dialogue")
     parser.add_argument("--file", "-f", help="Input file containing discussion")
+    parser.add_argument("--batch-file", help="JSONL file with one discussion per line ({\"content\": ...})")
+    parser.add_argument("--concurrency", type=positive_int, default=8, help="Max discussions in an LLM step at once in batch mode")
     parser.add_argument("--no-save", action="store_true", help="Don't save output files")
     parser.add_argument("--no-logs", action="store_true", help="Don't save log files")
     parser.add_argument("--demo", action="store_true", help="Run with sample discussion")
+    parser.add_argument("--cache", action="store_true", help="Reuse cached agent responses across runs")
+    parser.add_argument("--semantic-cache", action="store_true", help="Reuse results of near-duplicate discussions (kept between runs with --cache)")
+    parser.add_argument("--no-score", action="store_true", help="Skip quality scoring (score is reported as N/A)")
     
     args = parser.parse_args()
     
+    setup_console_logging()
+    
     print("🚀 NewsGroup Discussion Processor")
     print("=" * 50)
     
@@ -87,7 +97,10 @@ def main():
     discussion_content = None
     source = "unknown"
     
-    if args.file:
+    if args.batch_file:
+        source = f"batch file: {args.batch_file}"
+        print(f"📚 Loading discussions from batch file: {args.batch_file}")
+    elif args.file:
         source = f"file: {args.file}"
         print(f"📁 Loading discussion from file: {args.file}")
         # We'll let the crew handle file loading
@@ -99,23 +112,48 @@ def main():
         print("❌ No input provided. Use --file to specify a file or --demo for sample content")
         return 1
     
+    # Persist agent responses (spam verdicts included) and the semantic index so re-runs skip the LLM calls
+    llm_cache = LLMCache(
+        FileCacheBackend(Path("output") / ".llm_cache.jsonl"),
+        semantic_path=Path("output") / ".semantic_index.npz"
+    ) if args.cache else None
+    if args.semantic_cache and not args.cache and not args.batch_file:
+        print("⚠️  --semantic-cache without --cache only matches discussions within one run; add --cache")
+    
     try:
+        if args.batch_file:
+            crew = NewsGroupCrew("dummy content", llm_cache=llm_cache)
+            print(f"🔧 Processing discussions from {source}")
+            results = await crew.process_batch_file(
+                args.batch_file,
+                max_concurrency=args.concurrency,
+                save_output=not args.no_save,
+                save_logs=not args.no_logs,
+                enable_semantic_cache=args.semantic_cache,
+                score=not args.no_score
+            )
+            return print_batch_summary(results, save_output=not args.no_save)
+        
         # Initialize crew
         if args.file:
             # Create crew with dummy content first, then process from file
-            crew = NewsGroupCrew("dummy content")
+            crew = NewsGroupCrew("dummy content", llm_cache=llm_cache)
             print(f"🔧 Processing discussion from {source}")
-            result = crew.process_from_file(
+            result = await crew.process_from_file(
                 args.file, 
                 save_output=not args.no_save,
-                save_logs=not args.no_logs
+                save_logs=not args.no_logs,
+                enable_semantic_cache=args.semantic_cache,
+                score=not args.no_score
             )
         else:
-            crew = NewsGroupCrew(discussion_content)
+            crew = NewsGroupCrew(discussion_content, llm_cache=llm_cache)
             print(f"🔧 Processing discussion from {source}")
-            result = crew.process_discussion(
+            result = await crew.process_discussion(
                 save_output=not args.no_save,
-                save_logs=not args.no_logs
+                save_logs=not args.no_logs,
+                enable_semantic_cache=args.semantic_cache,
+                score=not args.no_score
             )
         
         # Display results
@@ -137,7 +175,8 @@ def main():
             print(f"📏 Processed length: {result['stats']['processed_length']} characters")
             print(f"💾 Files saved: {result['stats']['files_saved']}")
             
-            print(f"\n🎭 GENERATED DIALOGUE (Score: {result['score']}/10)")
+            score_label = f"{result['score']}/10" if result['score'] != "N/A" else "N/A"
+            print(f"\n🎭 GENERATED DIALOGUE (Score: {score_label})")
             print("-" * 50)
             
             # Display dialogue with truncation for long content
@@ -149,12 +188,13 @@ def main():
             else:
                 print(dialogue)
             
-            print(f"\n🏆 Quality Score: {result['score']}/10")
+            print(f"\n🏆 Quality Score: {score_label}")
             
             if not args.no_save:
                 print(f"\n📂 Output files saved to: output/")
                 print("   • dialogue_output.txt - The generated dialogue")
-                print("   • dialogue_score.txt - Score and details")
+                if not args.no_score:
+                    print("   • dialogue_score.txt - Score and details")
             
             if not args.no_logs:
                 print("   • logs/ - Processing logs")
@@ -170,6 +210,31 @@ def main():
         print("💡 Check your environment setup and try again")
         return 1
 
+def print_batch_summary(results, save_output: bool) -> int:
+    """Print per-status counts for a batch run and return the exit code"""
+    print("\n" + "=" * 60)
+    print("📊 BATCH RESULTS")
+    print("=" * 60)
+    
+    if not results:
+        print("❌ No discussions were processed")
+        return 1
+    
+    succeeded = sum(1 for result in results if result.get("status") == "success")
+    filtered = sum(1 for result in results if result.get("status") == "filtered")
+    failed = sum(1 for result in results if "error" in result)
+    
+    print(f"✅ Processed: {succeeded}")
+    print(f"🚫 Filtered: {filtered}")
+    print(f"❌ Failed: {failed}")
+    
+    if save_output:
+        print("\n📂 Results saved to: output/batch_results.jsonl")
+        print("   • dialogue_output_<n>.txt - Dialogue for the n-th discussion")
+    
+    print("\n✨ Processing complete!")
+    return 0
+
 def create_sample_file():
     """Helper function to create a sample discussion file"""
     sample_file = Path("sample_discussion.txt")
@@ -183,5 +248,5 @@ if __name__ == "__main__":
     create_sample_file()
     
     # Run main function
-    exit_code = main()
+    exit_code = asyncio.run(main())
     sys.exit(exit_code)
\ No newline at end of file
@@ -1,40 +1,66 @@
+import os
+import asyncio
+import hashlib
 from crewai import Task
+from agents import GEMINI_MODEL, agent_preamble
+from tools import SCORE_DIMENSIONS, PROMPT_TOKEN_BUDGET, LoggingTools, TextProcessor
+from typing import Dict, List, Optional
 
-class NewsGroupTasks:
-    def __init__(self, discussion_content):
-        self.discussion_content = discussion_content
-    
-    def spam_filter_task(self, agent):
-        return Task(
-            description=f"""
-            Analyze the following text to determine if it contains spam, advertisements, 
-            newsletters, or inappropriate/vulgar language.
+# Every task description starts with this same text and keeps its static instructions ahead
+# of the dynamic input, so calls share the longest possible byte-identical prompt prefix
+# (which Gemini's implicit context caching can reuse)
+_STATIC_PREFIX = """
+            You are one stage of a pipeline that turns newsgroup discussions into movie-style dialogue:
+            spam filtering, participant analysis, scriptwriting, formatting and quality scoring.
+            Follow the instructions below exactly. The input to work on is given at the end.
+            """
+
+_FORMATTING_INSTRUCTIONS = _STATIC_PREFIX + """
+            Clean and format the dialogue text to professional standards.
             
-            TEXT TO ANALYZE:
-            {self.discussion_content}
+            FORMATTING REQUIREMENTS:
+            1. Remove all bracketed actions: [nodding], [gesturing], etc.
+            2. Remove all parenthetical actions: (smiling), (laughing), etc.
+            3. Clean up inconsistent spacing and line breaks
+            4. Ensure consistent speaker name formatting
+            5. Remove any remaining formatting artifacts
+            6. Maintain proper dialogue structure
+            7. Ensure professional, readable presentation
             
+            PRESERVE:
+            - All actual dialogue content
+            - Speaker identifications
+            - Logical conversation flow
+            - Paragraph structure where appropriate
+            """
+
+# {"clarity": <1-10>, ...} - the JSON shape the scorer must return
+_SCORE_SCHEMA = "{" + ", ".join(f'"{dimension}": <1-10>' for dimension in SCORE_DIMENSIONS) + "}"
+
+_SPAM_CRITERIA = """
             EVALUATION CRITERIA:
             - Spam: Unsolicited promotional content, repetitive messaging
             - Advertisements: Product promotions, sales pitches, marketing content
             - Newsletters: Formatted email-style announcements or updates
             - Vulgar Language: Offensive, inappropriate, or profane content
             - Inappropriate Content: Harmful, discriminatory, or offensive material
-            
+            """
+
+# Static parts of the per-discussion prompts, built once; the descriptions join them around the
+# input instead of re-rendering the whole template for every discussion
+_SPAM_PREFIX = _STATIC_PREFIX + f"""
+            Analyze the text below to determine if it contains spam, advertisements, 
+            newsletters, or inappropriate/vulgar language.
+            {_SPAM_CRITERIA}
             RESPONSE FORMAT:
             - If content is problematic: Start with "STOP" followed by specific reasoning
             - If content is acceptable: Start with "PASS" followed by brief explanation
-            """,
-            expected_output="Either 'STOP' or 'PASS' followed by clear reasoning for the decision",
-            agent=agent
-        )
-    
-    def analysis_task(self, agent):
-        return Task(
-            description=f"""
-            Analyze the following discussion text and extract key information about each participant's contributions.
             
-            DISCUSSION CONTENT:
-            {self.discussion_content}
+            TEXT TO ANALYZE:
+            """
+
+_ANALYSIS_PREFIX = _STATIC_PREFIX + """
+            Analyze the discussion text below and extract key information about each participant's contributions.
             
             YOUR TASK:
             1. Identify all discussion participants (speakers/contributors)
@@ -48,15 +74,157 @@ class NewsGroupTasks:
             - Main discussion topics
             - Different perspectives presented
             - Important facts or claims made
-            """,
+            
+            DISCUSSION CONTENT:
+            """
+
+_SCORING_PREFIX = _STATIC_PREFIX + f"""
+            Score the dialogue transformation below on each of your 10 dimensions.
+            
+            RESPONSE FORMAT:
+            Only a JSON object with an integer from 1 to 10 for every dimension, no other text:
+            {_SCORE_SCHEMA}
+            
+            DIALOGUE TO SCORE:
+            """
+
+_INPUT_SUFFIX = "\n            "
+
+# Discussions packed into a single spam filter prompt by spam_filter_batch
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10"))
+
+# Gemini Batch Mode scoring (NEWSGROUP_BATCH_MODE=1): seconds between job status checks
+BATCH_POLL_SECONDS = 30
+_BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+class NewsGroupTasks:
+    def __init__(self, discussion_content):
+        self.discussion_content = discussion_content
+    
+    @classmethod
+    async def spam_filter_batch(cls, agent, discussions: List[str]) -> List[Optional[str]]:
+        """Spam-check discussions MAX_BATCH_SIZE at a time, one LLM call per batch; None where no verdict came back"""
+        async def check(batch: List[str]) -> List[Optional[str]]:
+            prompt = agent_preamble("spamfilter") + "\n" + cls.spam_filter_batch_description(batch)
+            try:
+                response = await agent.llm.ainvoke(prompt)
+            except Exception as e:
+                LoggingTools.log_error(f"Batched spam filter call failed: {str(e)}", "Batch Tasks")
+                return [None] * len(batch)
+            return TextProcessor.parse_spam_verdicts(str(response.content), len(batch))
+        
+        batches = [discussions[start:start + MAX_BATCH_SIZE] for start in range(0, len(discussions), MAX_BATCH_SIZE)]
+        results = await asyncio.gather(*[check(batch) for batch in batches])
+        return [verdict for batch_verdicts in results for verdict in batch_verdicts]
+    
+    @staticmethod
+    def fits_spam_batch(content: str) -> bool:
+        """Whether a discussion fits whole in its share of a packed spam prompt"""
+        return TextProcessor.count_tokens(content) <= PROMPT_TOKEN_BUDGET // MAX_BATCH_SIZE
+    
+    @staticmethod
+    def spam_filter_batch_description(discussions: List[str]) -> str:
+        # Texts go in whole (callers pack only those that pass fits_spam_batch): a verdict on a truncated
+        # text would be cached under the full content's key
+        texts = "\n\n".join(f"[{number}]\n{content}" for number, content in enumerate(discussions, 1))
+        return _STATIC_PREFIX + f"""
+            Analyze each numbered text below to determine if it contains spam, advertisements, 
+            newsletters, or inappropriate/vulgar language. Judge every text on its own.
+            {_SPAM_CRITERIA}
+            RESPONSE FORMAT:
+            Only a JSON array with one object per text, no other text:
+            [{{"id": <text number>, "verdict": "PASS" or "STOP", "reason": "<brief reasoning>"}}, ...]
+            
+            TEXTS TO ANALYZE:
+            {texts}
+            """
+    
+    def spam_filter_task(self, agent):
+        return Task(
+            description=self.spam_filter_description(),
+            expected_output="Either 'STOP' or 'PASS' followed by clear reasoning for the decision",
+            agent=agent
+        )
+    
+    def spam_filter_description(self) -> str:
+        return "".join((_SPAM_PREFIX, TextProcessor.truncate_to_budget(self.discussion_content), _INPUT_SUFFIX))
+    
+    def analysis_task(self, agent):
+        return Task(
+            description=self.analysis_description(),
             expected_output="A structured analysis clearly identifying each participant's arguments and main discussion points, with appropriate rewording while preserving core meanings",
             agent=agent
         )
     
+    def analysis_description(self) -> str:
+        return "".join((_ANALYSIS_PREFIX, self.discussion_content, _INPUT_SUFFIX))
+    
+    @staticmethod
+    def chunk_analysis_description(chunk: str, part: int, total: int) -> str:
+        # Map step for discussions over the token budget: analyze one excerpt on its own
+        return _STATIC_PREFIX + f"""
+            Analyze the discussion excerpt below (part {part} of {total} of a longer discussion) and
+            extract key information about each participant's contributions in it.
+            
+            YOUR TASK:
+            1. Identify the participants who speak in this excerpt
+            2. Extract their main arguments, points, or positions, in order
+            3. You may rephrase or reword statements for clarity, but preserve the core meaning
+            4. Note points that appear to respond to earlier parts of the discussion
+            
+            DISCUSSION EXCERPT:
+            {chunk}
+            """
+    
+    @staticmethod
+    def merge_analysis_description(partial_analyses: List[str]) -> str:
+        # Reduce step: combine the per-excerpt analyses, in discussion order, into one analysis
+        parts = "\n\n".join(f"PART {part}:\n{analysis}" for part, analysis in enumerate(partial_analyses, 1))
+        return _STATIC_PREFIX + f"""
+            Combine the analyses below, each covering one consecutive part of the same discussion,
+            into a single analysis of the whole discussion.
+            
+            YOUR TASK:
+            1. Group the arguments, points, and positions by participant
+            2. Keep the order in which each point was made across parts
+            3. Merge repeated points and keep the logical flow of the discussion
+            
+            ANALYSES BY PART:
+            {parts}
+            """
+    
+    def speaker_analysis_task(self, agent):
+        # {speaker} and {discussion_content} are filled per participant by kickoff inputs.
+        # The speaker comes last so every per-participant call shares the discussion as prefix.
+        return Task(
+            description=_STATIC_PREFIX + """
+            Analyze the discussion text below and extract the contributions of the participant named after it.
+            
+            YOUR TASK:
+            1. Extract the main arguments, points, or positions of that participant
+            2. Note which other participants they respond to, and how
+            3. You may rephrase or reword statements for clarity, but preserve the core meaning
+            4. Keep the order in which they made each point
+            
+            FOCUS ON:
+            - Key arguments and positions
+            - Agreements and disagreements with other participants
+            - Important facts or claims made
+            
+            DISCUSSION CONTENT:
+            {discussion_content}
+            
+            PARTICIPANT TO ANALYZE: {speaker}
+            """,
+            expected_output="A structured analysis of {speaker}'s arguments and positions, in discussion order, with appropriate rewording while preserving core meanings",
+            agent=agent
+        )
+    
     def scriptwriting_task(self, agent):
+        # {analysis} is filled by kickoff inputs with the combined participant analyses
         return Task(
-            description="""
-            Transform the analyzed conversation into a natural movie script dialogue format.
+            description=_STATIC_PREFIX + """
+            Transform the analyzed conversation below into a natural movie script dialogue format.
             
             STRICT REQUIREMENTS:
             ✓ INCLUDE: Only spoken dialogue text
@@ -76,57 +244,81 @@ class NewsGroupTasks:
             SPEAKER2: [Their response here]
             
             Make the dialogue sound natural and engaging while preserving the original discussion's essence.
+            
+            ANALYZED CONVERSATION:
+            {analysis}
             """,
             expected_output="Clean movie script dialogue with only speaker names and spoken text, no stage directions, actions, or parentheticals",
             agent=agent
         )
     
-    def formatting_task(self, agent):
-        return Task(
-            description="""
-            Clean and format the dialogue text to professional standards.
-            
-            FORMATTING REQUIREMENTS:
-            1. Remove all bracketed actions: [nodding], [gesturing], etc.
-            2. Remove all parenthetical actions: (smiling), (laughing), etc.
-            3. Clean up inconsistent spacing and line breaks
-            4. Ensure consistent speaker name formatting
-            5. Remove any remaining formatting artifacts
-            6. Maintain proper dialogue structure
-            7. Ensure professional, readable presentation
+    def formatting_prompt(self, script: str) -> str:
+        # Plain prompt for streaming the formatter directly from the LLM
+        return f"""{_FORMATTING_INSTRUCTIONS}
+            Respond with only the formatted dialogue.
             
-            PRESERVE:
-            - All actual dialogue content
-            - Speaker identifications
-            - Logical conversation flow
-            - Paragraph structure where appropriate
-            """,
-            expected_output="Professionally formatted, clean dialogue text with all bracketed/parenthetical actions removed and consistent formatting throughout",
-            agent=agent
-        )
+            DIALOGUE TO FORMAT:
+            {script}
+            """
     
     def scoring_task(self, agent, dialogue_result):
         return Task(
-            description=f"""
-            Evaluate the quality of the following dialogue transformation using your established criteria.
-            
-            DIALOGUE TO SCORE:
-            {dialogue_result}
-            
-            EVALUATION PROCESS:
-            1. Assess each of the 10 criteria mentioned in your goal (Clarity, Relevance, Conciseness, etc.)
-            2. Consider the overall effectiveness of the dialogue
-            3. Provide a comprehensive score from 1-10
-            
-            RESPONSE FORMAT:
-            - First line: Only the numerical score (1-10)
-            - Subsequent lines: Brief explanation of the score, highlighting key strengths and areas for improvement
-            
-            EXAMPLE:
-            8
-            The dialogue demonstrates strong clarity and natural flow, with good engagement between participants. 
-            Minor improvements could be made in conciseness, but overall it effectively captures the original discussion.
-            """,
-            expected_output="A numerical score (1-10) on the first line, followed by a brief explanation of the scoring rationale",
+            description=self.scoring_description(dialogue_result),
+            expected_output="A JSON object with an integer score (1-10) for each of the 10 dimensions",
             agent=agent
-        )
\ No newline at end of file
+        )
+    
+    @staticmethod
+    def scoring_description(dialogue_result: str) -> str:
+        return "".join((_SCORING_PREFIX, TextProcessor.truncate_to_budget(dialogue_result), _INPUT_SUFFIX))
+    
+    @staticmethod
+    async def scoring_task_batch_submit(dialogues: List[str]) -> str:
+        """Submit scoring prompts as one Gemini Batch Mode job (half price, queued server-side) and return its name"""
+        from google import genai  # Only needed for NEWSGROUP_BATCH_MODE runs
+        
+        client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        preamble = agent_preamble("scorer") + "\n"
+        requests = [
+            {
+                "contents": [{"role": "user", "parts": [{"text": preamble + NewsGroupTasks.scoring_description(dialogue)}]}],
+                "config": {"temperature": 0.0},
+            }
+            for dialogue in dialogues
+        ]
+        job = await client.aio.batches.create(
+            model=GEMINI_MODEL,
+            src=requests,
+            config={"display_name": f"newsgroup-scoring-{len(dialogues)}"}
+        )
+        return job.name
+    
+    @staticmethod
+    async def scoring_task_batch_collect(job_name: str, poll_interval: float = BATCH_POLL_SECONDS) -> List[Optional[Dict[str, int]]]:
+        """Wait for a scoring batch job and return the parsed scores per dialogue, None where scoring failed"""
+        from google import genai
+        
+        client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        job = await client.aio.batches.get(name=job_name)
+        while job.state.name not in _BATCH_DONE_STATES:
+            await asyncio.sleep(poll_interval)
+            job = await client.aio.batches.get(name=job_name)
+        
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Scoring batch job {job_name} ended in state {job.state.name}")
+        
+        return [
+            TextProcessor.parse_scores(response.response.text) if response.response else None
+            for response in job.dest.inlined_responses
+        ]
+
+# Cache stage name for spam verdicts. It carries a hash of every spam prompt template, so
+# editing a prompt starts a fresh set of cached verdicts instead of serving ones from the old prompt
+SPAM_CACHE_STAGE = "spam-" + hashlib.blake2b(
+    "\0".join((
+        agent_preamble("spamfilter"),
+        NewsGroupTasks("").spam_filter_description(),
+        NewsGroupTasks.spam_filter_batch_description([]),
+    )).encode("utf-8"),
+    digest_size=6,
+).hexdigest()
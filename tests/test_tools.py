@@ -0,0 +1,258 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+
+import pytest
+
+from tools import (SCORE_DIMENSIONS, DialogueStreamCleaner, FileCacheBackend, LLMCache, LoggingTools,
+                   SpamHeuristic, TextProcessor)
+
+# Characters that exercise every branch of the cleaner: delimiters, whitespace runs and text
+_ALPHABET = "ab (){}[] \t\n\n"
+
+
+def _stream_clean(text, cuts):
+    cleaner = DialogueStreamCleaner()
+    pieces, start = [], 0
+    for cut in cuts + [len(text)]:
+        pieces.append(cleaner.feed(text[start:cut]))
+        start = cut
+    pieces.append(cleaner.close())
+    return "".join(pieces)
+
+
+def test_stream_cleaner_matches_clean_dialogue_for_any_chunking():
+    rng = random.Random(1234)
+    for _ in range(20000):
+        text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 40)))
+        cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(0, min(len(text), 6))))
+        assert _stream_clean(text, cuts) == TextProcessor.clean_dialogue(text), (text, cuts)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "John: Hello (smiling) there\n\n\n\nSarah:   Hi [waves]   back",
+    "Unclosed (paren keeps\n its text [but this] goes",
+    "  leading\t\tand trailing  \n",
+])
+def test_stream_cleaner_one_character_at_a_time(text):
+    assert _stream_clean(text, list(range(1, len(text)))) == TextProcessor.clean_dialogue(text)
+
+
+def _scores(**overrides):
+    scores = {dimension: 7 for dimension in SCORE_DIMENSIONS}
+    scores.update(overrides)
+    return scores
+
+
+def test_parse_scores_reads_fenced_json_and_clamps():
+    text = "```json\n" + json.dumps(_scores(clarity=15, flow=0, coherence=8.6)) + "\n```"
+    scores = TextProcessor.parse_scores(text)
+    assert scores == _scores(clarity=10, flow=1, coherence=8)
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "no json here",
+    "{not valid json}",
+    json.dumps({dimension: 5 for dimension in SCORE_DIMENSIONS[1:]}),
+    json.dumps(_scores(clarity="7")),
+    json.dumps(_scores(clarity=True)),
+])
+def test_parse_scores_rejects_incomplete_output(text):
+    assert TextProcessor.parse_scores(text) is None
+
+
+def test_parse_spam_verdicts_maps_ids_to_positions():
+    text = 'Here you go: [{"id": 2, "verdict": "stop", "reason": "ad"}, {"id": 1, "verdict": "PASS"}, ' \
+           '{"id": 4, "verdict": "PASS"}, {"id": 3, "verdict": "MAYBE"}, "junk"]'
+    assert TextProcessor.parse_spam_verdicts(text, 3) == ["PASS", "STOP ad", None]
+
+
+@pytest.mark.parametrize("text", [None, "", "PASS", "[not json]", '{"id": 1, "verdict": "PASS"}'])
+def test_parse_spam_verdicts_without_an_array(text):
+    assert TextProcessor.parse_spam_verdicts(text, 2) == [None, None]
+
+
+_DISCUSSION = (
+    "John: I've been reading the new transit proposal and it looks promising to me.\n"
+    "Sarah: The funding section is thin though; where does the money actually come from?\n"
+    "John: Mostly a regional sales tax, which is spelled out in the appendix.\n"
+)
+
+
+@pytest.mark.parametrize("content, issue", [
+    ("", TextProcessor.EMPTY),
+    ("   \n\t ", TextProcessor.EMPTY),
+    ("John: hi\nSarah: hello\nJohn: bye", TextProcessor.TOO_SHORT),
+    ("x" * 200 + "\n\n" + "y" * 50, TextProcessor.TOO_FEW_LINES),
+    ("John: " + "words " * 30 + "\nJohn: more\nJohn: and more", TextProcessor.TOO_FEW_SPEAKERS),
+    ("John: " + "words " * 60 + "\nSarah: ok\nJohn: fine\nSarah: sure", TextProcessor.MONOLOGUE),
+    ("John: " + "words " * 30 + "\nNote: this is John again\nJohn: more\nJohn: and more", TextProcessor.TOO_FEW_SPEAKERS),
+    ("John: I think the plan works.\nSarah: My concern is the cost.\nMy point is: budgets slip\n"
+     "John: The appendix covers it.\nSarah: Fine, then.", None),
+    (_DISCUSSION, None),
+    (_DISCUSSION.replace("John:", "Mary Ann:").replace("Sarah:", "J. Smith:"), None),
+    ("Bob wrote:\n> I disagree with the plan entirely and think we should reconsider it.\n"
+     "> The costs are too high.\nActually the costs are fine if you read the appendix, Bob.", None),
+])
+def test_content_issue(content, issue):
+    assert TextProcessor.content_issue(content) == issue
+    assert TextProcessor.validate_discussion_content(content) == (issue is None)
+
+
+def test_extract_speakers_allows_multi_word_names_and_skips_urls():
+    content = ("Mary Ann: hi\nJ. Smith: see https://example.com\nhttps://example.com/x\n"
+               "O'Brien: yes\n10:30 is fine\nMary Ann: ok\nJ. Smith: sure\nO'Brien: bye")
+    assert TextProcessor.extract_speakers(content) == ["Mary Ann", "J. Smith", "O'Brien"]
+
+
+def test_extract_speakers_needs_capitalised_names_with_two_turns():
+    content = ("John: hi\nMy point is: lowercase words are not names\nmy point is: still not\n"
+               "Note: a one-off label\nSarah: hello\nJohn: bye\nSarah: see you")
+    assert TextProcessor.extract_speakers(content) == ["John", "Sarah"]
+
+
+_LINK_DUMP = ("LIMITED OFFER!!! Click here: https://deals.example/a https://deals.example/b "
+              "https://deals.example/c Use promo code SAVE50. Unsubscribe: https://deals.example/u")
+
+
+def test_spam_heuristic_rejects_promo_link_dump():
+    assert SpamHeuristic.classify(_LINK_DUMP) == SpamHeuristic.CLEARLY_SPAM
+
+
+@pytest.mark.parametrize("content", [
+    _DISCUSSION + "\nSarah: For the setup, click here: https://docs.python.org/3/library/asyncio.html",
+    "John: Sources: https://a.example/1 https://b.example/2 https://c.example/3\nSarah: Thanks!",
+    "John: Is that limited offer real? Click here to check? https://shop.example/x\nSarah: No.",
+    "",
+])
+def test_spam_heuristic_leaves_posts_with_links_to_the_agent(content):
+    assert SpamHeuristic.classify(content) == SpamHeuristic.UNCERTAIN
+
+
+def test_split_to_budget_keeps_whole_lines_within_budget():
+    text = "".join(f"Speaker{number}: line number {number} of the discussion\n" for number in range(200))
+    chunks = TextProcessor.split_to_budget(text, max_tokens=50)
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert all(TextProcessor.count_tokens(chunk) <= 50 for chunk in chunks)
+    assert all(chunk.endswith("\n") for chunk in chunks)
+
+
+def test_split_to_budget_truncates_an_overlong_line():
+    chunks = TextProcessor.split_to_budget("short line\n" + "word " * 500 + "\n", max_tokens=20)
+    assert chunks[0] == "short line\n"
+    assert chunks[-1].endswith("[... truncated ...]")
+
+
+class _YieldingDeque(deque):
+    """A deque that hands the GIL to another thread on every append, to expose unlocked writers"""
+    
+    def append(self, item):
+        time.sleep(0)
+        super().append(item)
+
+
+def test_log_columns_stay_aligned_across_threads(monkeypatch):
+    for column in ("_timestamps", "_categories", "_names", "_texts", "_args"):
+        monkeypatch.setattr(LoggingTools, column, _YieldingDeque())
+    start = threading.Barrier(2)
+    
+    def steps():
+        start.wait()
+        for number in range(2000):
+            LoggingTools.log_step("STEP", "step %d", number)
+    
+    def results():
+        start.wait()
+        for number in range(2000):
+            LoggingTools.log_result("RESULT", f"100% result {number}")
+    
+    threads = [threading.Thread(target=steps), threading.Thread(target=results)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    records = [json.loads(line) for line in LoggingTools.iter_log_records()]
+    assert len(records) == 4000
+    for record in records:
+        if record["category"] == "step":
+            assert record["step"] == "STEP" and record["message"].startswith("step ")
+        else:
+            assert record["title"] == "RESULT" and record["preview"].startswith("100% result ")
+
+
+def test_file_cache_backend_recovers_from_a_torn_tail(tmp_path):
+    path = tmp_path / "cache.jsonl"
+    path.write_text('{"key": "a", "value": 1}\n{"key": "b", "val', encoding="utf-8")
+    
+    backend = FileCacheBackend(path)
+    assert backend.get("a") == 1
+    assert backend.get("b") is None
+    backend.set("c", {"score": 3})
+    
+    reloaded = FileCacheBackend(path)
+    assert reloaded.get("a") == 1
+    assert reloaded.get("c") == {"score": 3}
+
+
+def test_file_cache_backend_keeps_concurrent_appends(tmp_path):
+    path = tmp_path / "cache.jsonl"
+    backend = FileCacheBackend(path)
+    
+    def write(thread_number):
+        for number in range(200):
+            backend.set(f"{thread_number}-{number}", number)
+    
+    threads = [threading.Thread(target=write, args=(thread_number,)) for thread_number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1600
+    assert all(json.loads(line)["value"] == int(json.loads(line)["key"].split("-")[1]) for line in lines)
+    reloaded = FileCacheBackend(path)
+    assert all(reloaded.get(f"{thread_number}-199") == 199 for thread_number in range(8))
+
+
+def test_llm_cache_counts_hits_and_misses():
+    cache = LLMCache()
+    assert cache.get("score", "model", "dialogue") is None
+    cache.set("score", "model", "dialogue", {"clarity": 8})
+    assert cache.contains("score", "model", "dialogue")
+    assert not cache.contains("score", "other-model", "dialogue")
+    assert cache.get("score", "model", "dialogue") == {"clarity": 8}
+    assert cache.stats() == {"hits": 1, "misses": 1, "semantic_hits": 0}
+
+
+def test_llm_cache_semantic_lookup_uses_the_threshold():
+    cache = LLMCache(similarity_threshold=0.9)
+    cache.semantic_store([1.0, 0.0, 0.0], {"score": "7"})
+    cache.semantic_store([0.0, 1.0, 0.0], {"score": "4"})
+    
+    assert cache.semantic_lookup([0.95, 0.05, 0.0]) == {"score": "7"}
+    assert cache.semantic_lookup([0.6, 0.6, 0.5]) is None
+    assert cache.semantic_lookup([1.0, 0.0]) is None  # Embedding from a different model
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_llm_cache_saves_and_reloads_the_semantic_index(tmp_path):
+    path = tmp_path / "index.npz"
+    cache = LLMCache(semantic_path=path)
+    assert not cache.save_semantic_index()  # Nothing new to write
+    
+    cache.semantic_store([3.0, 4.0], {"dialogue": "A: hi", "score": "9"})
+    assert cache.save_semantic_index()
+    assert not cache.save_semantic_index()
+    
+    reloaded = LLMCache(semantic_path=path)
+    assert reloaded.semantic_lookup([0.6, 0.8]) == {"dialogue": "A: hi", "score": "9"}
+    reloaded.semantic_store([1.0, 0.0, 0.0], {"score": "5"})  # New embedding size replaces the index
+    assert reloaded.semantic_lookup([0.6, 0.8]) is None
+    assert reloaded.semantic_lookup([1.0, 0.0, 0.0]) == {"score": "5"}
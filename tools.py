@@ -1,93 +1,290 @@
 import re
 import os
+import sys
+import asyncio
+import logging
+import json
+import hashlib
+import functools
+import tempfile
+import threading
+import time
+import numpy as np
+from collections import Counter, deque
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Protocol, Iterable, Deque, Set
 from datetime import datetime
 
+# Status messages from the tools go through one logger; applications attach a handler with
+# setup_console_logging (main.py does), otherwise only warnings and errors reach stderr
+logger = logging.getLogger("newsgroup")
+
+# Logger messages carry ASCII status prefixes; only an interactive terminal shows them as emoji
+_STATUS_EMOJI = {"[OK]": "✅", "[WARN]": "⚠️ ", "[ERR]": "❌"}
+
+class _TerminalFormatter(logging.Formatter):
+    """Render ASCII status prefixes as emoji for a terminal"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        body = message.lstrip("\n")  # Error entries start with a blank line
+        prefix, _, rest = body.partition(" ")
+        emoji = _STATUS_EMOJI.get(prefix)
+        return f"{message[:len(message) - len(body)]}{emoji} {rest}" if emoji else message
+
+def setup_console_logging():
+    """Write the tools' status messages to stdout, in order with print() output"""
+    if logger.handlers:
+        return
+    
+    console = logging.StreamHandler(sys.stdout)
+    formatter = _TerminalFormatter if sys.stdout.isatty() else logging.Formatter
+    console.setFormatter(formatter("%(message)s"))
+    logger.addHandler(console)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# TextProcessor's patterns use the stdlib re engine on purpose: none of them can backtrack
+# catastrophically, and google-re2's Python binding measured 10-30x slower on this workload
+# (its per-call and per-match overhead dominates on short, match-dense dialogue text)
+
+# Stage directions: (smiling), [nodding], {action} - one alternation, removed in a single pass
+_STAGE_DIRECTION_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]|\{[^}]*\}")
+_INLINE_WS_RE = re.compile(r"[ \t]+")
+_LINE_EDGE_WS_RE = re.compile(r"^[ \t]+|[ \t]+$", re.MULTILINE)
+_MULTI_NEWLINE_RE = re.compile(r"\n\s*\n\s*\n+")
+_WS_RUN_RE = re.compile(r"([ \t\n]+)")
+_OPENER_RE = re.compile(r"[(\[{]")
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+
+# Characters not allowed in filenames, each mapped to "_"
+_SANITIZE_TABLE = str.maketrans(dict.fromkeys('<>:"/\\|?*', '_'))
+
+# Lines holding anything besides whitespace
+_NON_EMPTY_LINE_RE = re.compile(r"(?m)^[^\S\n]*\S")
+# Speaker prefixes at the start of a line: "John:", "Mary Ann:", "J. Smith:", "O'Brien:" (up to
+# four words starting with a letter, which must be capitalised - see TextProcessor._speaker_turns);
+# "https://..." and other URL schemes are not speakers
+_SPEAKER_RE = re.compile(r"^[ \t]*([^\W\d_][\w.'-]*(?:[ \t]+[^\W\d_][\w.'-]*){0,3})[ \t]*:(?!//)", re.MULTILINE)
+# Outermost JSON object / array, ignoring any ```json fence around it
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+# Spam heuristics
+_URL_RE = re.compile(r"https?://", re.IGNORECASE)
+_UNSUB_RE = re.compile(r"\b(unsubscribe|promo code|limited offer|click here)\b", re.IGNORECASE)
+
+# Most tokens of discussion/dialogue text inlined into one prompt; longer input is truncated
+# (spam filter, scoring) or analyzed in chunks (analysis)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
+
+# Dimensions the scorer agent rates, in the order they appear in its JSON output
+SCORE_DIMENSIONS = (
+    "clarity", "relevance", "conciseness", "politeness", "engagement",
+    "flow", "coherence", "responsiveness", "language_use", "emotional_intelligence",
+)
+
 class TextProcessor:
     """Utility class for text processing operations"""
     
+    # Reasons content_issue() rejects a discussion, with the message shown for each
+    EMPTY = "empty"
+    TOO_SHORT = "too_short"
+    TOO_FEW_LINES = "too_few_lines"
+    TOO_FEW_SPEAKERS = "too_few_speakers"
+    MONOLOGUE = "monologue"
+    CONTENT_ISSUE_MESSAGES = {
+        EMPTY: "Discussion content is empty",
+        TOO_SHORT: "Discussion content is too short (minimum 100 characters)",
+        TOO_FEW_LINES: "Discussion content has fewer than 3 non-empty lines",
+        TOO_FEW_SPEAKERS: "Discussion transcript has only one speaker (\"Name: ...\" lines)",
+        MONOLOGUE: "One utterance makes up more than 80% of the discussion",
+    }
+    
     @staticmethod
     def clean_dialogue(text: str) -> str:
-        """Remove stage directions and actions between brackets/parentheses"""
+        """Remove stage directions and actions between brackets/parentheses (reference for DialogueStreamCleaner)"""
         if not text:
             return ""
             
-        # Remove content in parentheses like (smiling), (laughing), etc.
-        cleaned = re.sub(r"\([^)]*\)", "", text)
-        # Remove content in square brackets like [nodding], [gesturing], etc.
-        cleaned = re.sub(r"\[[^\]]*\]", "", cleaned)
-        # Remove content in curly braces like {action}, etc.
-        cleaned = re.sub(r"\{[^}]*\}", "", cleaned)
-        
-        # Clean up extra whitespace
-        cleaned = re.sub(r"\s+", " ", cleaned)
-        # Clean up multiple newlines but preserve paragraph structure
-        cleaned = re.sub(r"\n\s*\n\s*\n+", "\n\n", cleaned)
+        # Remove (smiling), [nodding], {action}, etc. - the substring checks are C-level scans,
+        # so text without any opening delimiter skips the regex pass entirely
+        cleaned = text
+        if "(" in text or "[" in text or "{" in text:
+            cleaned = _STAGE_DIRECTION_RE.sub("", text)
+        
+        # Clean up extra spaces within lines
+        cleaned = _INLINE_WS_RE.sub(" ", cleaned)
         # Remove leading/trailing whitespace from each line
-        lines = [line.strip() for line in cleaned.split('\n')]
-        cleaned = '\n'.join(line for line in lines if line)
+        cleaned = _LINE_EDGE_WS_RE.sub("", cleaned)
+        # Clean up multiple newlines but preserve paragraph structure
+        cleaned = _MULTI_NEWLINE_RE.sub("\n\n", cleaned)
         
         return cleaned.strip()
     
     @staticmethod
-    def extract_score(score_text: str) -> str:
-        """Extract numerical score from scoring agent output"""
+    def parse_scores(score_text: str) -> Optional[Dict[str, int]]:
+        """Parse the scorer's JSON output into per-dimension scores between 1-10"""
         if not score_text:
-            return "0"
-            
-        lines = score_text.strip().split("\n")
-        if not lines:
-            return "0"
-            
-        # Get the first line and extract any numbers
-        first_line = lines[0].strip()
+            return None
+        
+        match = _JSON_OBJECT_RE.search(score_text)
+        if not match:
+            return None
         
-        # Look for standalone number first
-        standalone_match = re.match(r"^(\d+)$", first_line)
-        if standalone_match:
-            score = int(standalone_match.group(1))
-            return str(min(max(score, 1), 10))  # Ensure score is between 1-10
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return None
         
-        # Look for a number with /10 or other formats
-        fraction_match = re.search(r"(\d+)(?:/10|/\d+)", first_line)
-        if fraction_match:
-            score = int(fraction_match.group(1))
-            return str(min(max(score, 1), 10))
+        if not isinstance(data, dict):
+            return None
         
-        # Look for any number in the first line
-        number_match = re.search(r"(\d+)", first_line)
-        if number_match:
-            score = int(number_match.group(1))
-            return str(min(max(score, 1), 10))
+        scores = {}
+        for dimension in SCORE_DIMENSIONS:
+            value = data.get(dimension)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            scores[dimension] = min(max(int(value), 1), 10)
         
-        return "0"
+        return scores
+    
+    @staticmethod
+    def parse_spam_verdicts(verdict_text: str, count: int) -> List[Optional[str]]:
+        """Parse a batched spam filter JSON array into "PASS ..."/"STOP ..." per item id 1..count"""
+        verdicts: List[Optional[str]] = [None] * count
+        match = _JSON_ARRAY_RE.search(verdict_text or "")
+        if not match:
+            return verdicts
+        
+        try:
+            entries = json.loads(match.group(0))
+        except ValueError:
+            return verdicts
+        
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            item_id, verdict = entry.get("id"), str(entry.get("verdict", "")).upper()
+            if isinstance(item_id, int) and 1 <= item_id <= count and verdict in ("PASS", "STOP"):
+                verdicts[item_id - 1] = f"{verdict} {entry.get('reason', '')}".strip()
+        
+        return verdicts
+    
+    @staticmethod
+    def extract_speakers(content: str) -> List[str]:
+        """Extract unique speaker names in order of first appearance"""
+        if not content:
+            return []
+        
+        return list(dict.fromkeys(marker.group(1) for marker in TextProcessor._speaker_turns(content)))
+    
+    @staticmethod
+    def _speaker_turns(content: str) -> List[re.Match]:
+        """Speaker prefixes of capitalised names that open at least 2 turns"""
+        # A one-off "Note:" or "Update:" label is more likely part of a post than a speaker
+        markers = [marker for marker in _SPEAKER_RE.finditer(content)
+                   if all(word[0].isupper() for word in marker.group(1).split())]
+        turns = Counter(marker.group(1) for marker in markers)
+        return [marker for marker in markers if turns[marker.group(1)] >= 2]
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _token_encoding():
+        # Gemini's tokenizer isn't available offline; cl100k_base is a close enough proxy for budgeting
+        try:
+            import tiktoken
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return None  # Fall back to ~4 characters per token
+    
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Approximate the number of LLM tokens in text"""
+        encoding = TextProcessor._token_encoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+    
+    @staticmethod
+    def truncate_to_budget(text: str, max_tokens: int = PROMPT_TOKEN_BUDGET) -> str:
+        """Cut text down to at most max_tokens tokens, marking the cut"""
+        encoding = TextProcessor._token_encoding()
+        if encoding is None:
+            return text if len(text) <= max_tokens * 4 else text[:max_tokens * 4] + "\n[... truncated ...]"
+        
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens]) + "\n[... truncated ...]"
+    
+    @staticmethod
+    def split_to_budget(text: str, max_tokens: int = PROMPT_TOKEN_BUDGET) -> List[str]:
+        """Split text at line boundaries into chunks of at most max_tokens tokens each"""
+        chunks, current, used = [], [], 0
+        for line in text.splitlines(keepends=True):
+            tokens = TextProcessor.count_tokens(line)
+            if current and used + tokens > max_tokens:
+                chunks.append("".join(current))
+                current, used = [], 0
+            current.append(line)
+            used += tokens
+        if current:
+            chunks.append("".join(current))
+        
+        # A single line longer than the budget is the only way a chunk can exceed it
+        return [TextProcessor.truncate_to_budget(chunk, max_tokens) for chunk in chunks]
     
     @staticmethod
     def validate_discussion_content(content: str) -> bool:
         """Validate that discussion content is not empty and has minimum length"""
-        if not content or not content.strip():
-            return False
+        return TextProcessor.content_issue(content) is None
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=128)  # The pipeline and processing summary validate the same content
+    def content_issue(content: str) -> Optional[str]:
+        """Return the reason discussion content is unusable, or None if it is valid"""
+        stripped = content.strip() if content else ""
+        if not stripped:
+            return TextProcessor.EMPTY
         
         # Check minimum length (increased for meaningful discussions)
-        if len(content.strip()) < 100:
-            return False
+        if len(stripped) < 100:
+            return TextProcessor.TOO_SHORT
         
         # Check if it looks like actual discussion content
         # Should have some dialogue markers or multiple sentences
-        lines = content.strip().split('\n')
-        non_empty_lines = [line.strip() for line in lines if line.strip()]
+        non_empty_lines = 0
+        for _ in _NON_EMPTY_LINE_RE.finditer(stripped):
+            non_empty_lines += 1
+            if non_empty_lines >= 3:
+                break
         
-        if len(non_empty_lines) < 3:  # At least 3 meaningful lines
-            return False
+        if non_empty_lines < 3:  # At least 3 meaningful lines
+            return TextProcessor.TOO_FEW_LINES
         
-        return True
+        # Structure checks only apply to transcripts with "Name:" turns; other formats, such as
+        # quoted newsgroup replies ("> ...", "X wrote:"), are left to the agents
+        markers = TextProcessor._speaker_turns(stripped)
+        if len(markers) < 3:
+            return None
+        
+        # A transcript should be a conversation between speakers, not a single monologue
+        if len({marker.group(1) for marker in markers}) < 2:
+            return TextProcessor.TOO_FEW_SPEAKERS
+        
+        bounds = [marker.start() for marker in markers] + [len(stripped)]
+        longest = max(end - start for start, end in zip(bounds, bounds[1:]))
+        if longest > 0.8 * len(stripped):
+            return TextProcessor.MONOLOGUE
+        
+        return None
     
     @staticmethod
     def sanitize_filename(filename: str) -> str:
         """Sanitize filename for safe file operations"""
         # Remove or replace invalid characters
-        sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        sanitized = filename.translate(_SANITIZE_TABLE)
         # Remove leading/trailing spaces and dots
         sanitized = sanitized.strip('. ')
         # Ensure filename is not empty
@@ -95,9 +292,108 @@ class TextProcessor:
             sanitized = "output"
         return sanitized
 
+class DialogueStreamCleaner:
+    """Incremental clean_dialogue for streamed text - stage directions may span chunks"""
+    
+    def __init__(self):
+        self._closer: Optional[str] = None  # Delimiter that ends the open stage direction
+        self._pending: List[str] = []  # Text of the open stage direction, kept if it never closes
+        self._started = False  # Some text has been emitted
+        self._space = False  # Whitespace seen since the last emitted text
+        self._newlines = 0  # Newlines in that whitespace
+    
+    def feed(self, chunk: str) -> str:
+        """Clean the next chunk, returning the text that is safe to emit"""
+        # Most formatter chunks hold no delimiter at all; the substring checks are C-level
+        # scans, so those skip the delimiter loop and go straight to whitespace collapsing
+        if not self._closer and "(" not in chunk and "[" not in chunk and "{" not in chunk:
+            return self._collapse_whitespace(chunk)
+        
+        kept = []
+        pos = 0
+        
+        while pos < len(chunk):
+            if self._closer:
+                end = chunk.find(self._closer, pos)
+                if end == -1:
+                    self._pending.append(chunk[pos:])
+                    break
+                # Stage direction closed - drop it entirely
+                self._closer = None
+                self._pending.clear()
+                pos = end + 1
+            else:
+                match = _OPENER_RE.search(chunk, pos)
+                if not match:
+                    kept.append(chunk[pos:])
+                    break
+                kept.append(chunk[pos:match.start()])
+                self._closer = _CLOSERS[match.group()]
+                self._pending.append(match.group())
+                pos = match.end()
+        
+        return self._collapse_whitespace("".join(kept))
+    
+    def close(self) -> str:
+        """Flush the remaining text at end of stream"""
+        if not self._closer:
+            return ""
+        
+        # Like clean_dialogue, an unclosed opener is kept as text; what follows it is still cleaned
+        pending = "".join(self._pending)
+        self._closer = None
+        self._pending.clear()
+        return self._collapse_whitespace(pending[0]) + self.feed(pending[1:]) + self.close()
+    
+    def _collapse_whitespace(self, text: str) -> str:
+        # Whitespace is held back until the next text, then emitted as one space, one line
+        # break or one blank line; leading and trailing whitespace is never emitted
+        kept = []
+        for piece in _WS_RUN_RE.split(text):
+            if not piece:
+                continue
+            if piece[0] in " \t\n":
+                self._space = True
+                self._newlines += piece.count("\n")
+                continue
+            if self._started and self._space:
+                kept.append("\n\n" if self._newlines > 1 else "\n" if self._newlines else " ")
+            kept.append(piece)
+            self._started = True
+            self._space = False
+            self._newlines = 0
+        return "".join(kept)
+
+class SpamHeuristic:
+    """Local spam check that rejects obvious spam without calling the spam filter agent"""
+    
+    # There is no "clearly clean": missing markers can't rule out ads, newsletters or abusive
+    # content, so everything that isn't obvious spam goes to the agent
+    CLEARLY_SPAM = "clearly_spam"
+    UNCERTAIN = "uncertain"
+    
+    @staticmethod
+    def classify(content: str) -> str:
+        """Classify content as clearly spam or uncertain"""
+        if not content:
+            return SpamHeuristic.UNCERTAIN
+        
+        urls = len(_URL_RE.findall(content))
+        promo_phrases = len(_UNSUB_RE.findall(content))
+        
+        # Only an ad-style link dump counts as proof: several promo phrases together with 3+ links,
+        # one every ~200 characters. A lone "click here", a list of doc links or heated language
+        # also show up in real discussions, so those go to the agent
+        if promo_phrases >= 2 and urls >= 3 and urls * 200 > len(content):
+            return SpamHeuristic.CLEARLY_SPAM
+        
+        return SpamHeuristic.UNCERTAIN
+
 class FileManager:
     """Utility class for file operations"""
     
+    _dirs_ready: Set[Path] = set()  # Directories already created by any FileManager in this process
+    
     def __init__(self, base_dir: Optional[Path] = None):
         self.base_dir = base_dir or Path.cwd()
         self.output_dir = self.base_dir / "output"
@@ -106,15 +402,17 @@ class FileManager:
     def ensure_directories(self):
         """Ensure necessary directories exist"""
         try:
-            self.output_dir.mkdir(exist_ok=True)
-            self.logs_dir.mkdir(exist_ok=True)
+            for directory in (self.output_dir, self.logs_dir):
+                if directory not in FileManager._dirs_ready:
+                    directory.mkdir(exist_ok=True)
+                    FileManager._dirs_ready.add(directory)
         except Exception as e:
-            print(f"Warning: Could not create directories: {e}")
+            logger.warning("[WARN] Could not create directories: %s", e)
     
     def save_result(self, content: str, filename: str) -> bool:
         """Save content to output directory with error handling"""
         if not content:
-            print(f"Warning: Attempting to save empty content to {filename}")
+            logger.warning("[WARN] Attempting to save empty content to %s", filename)
             return False
         
         self.ensure_directories()
@@ -126,44 +424,78 @@ class FileManager:
         try:
             with open(output_path, "w", encoding="utf-8") as file:
                 file.write(content)
-            print(f"✅ Result saved to: {output_path}")
+            logger.info("[OK] Result saved to: %s", output_path)
+            return True
+        except Exception as e:
+            logger.error("[ERR] Error saving file %s: %s", safe_filename, e)
+            return False
+    
+    async def save_result_async(self, content: str, filename: str) -> bool:
+        """Save content to output directory without blocking the event loop"""
+        return await asyncio.to_thread(self.save_result, content, filename)
+    
+    def open_result_stream(self, filename: str):
+        """Open a temporary file next to filename for incremental writes; see commit_result_stream"""
+        self.ensure_directories()
+        
+        safe_filename = TextProcessor.sanitize_filename(filename)
+        return tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.output_dir,
+                                           prefix=f".{safe_filename}.", suffix=".part", delete=False)
+    
+    def commit_result_stream(self, stream, filename: str) -> bool:
+        """Close a finished result stream and move it over filename in one step"""
+        stream.close()
+        output_path = self.output_dir / TextProcessor.sanitize_filename(filename)
+        
+        try:
+            os.replace(stream.name, output_path)
+            logger.info("[OK] Result saved to: %s", output_path)
             return True
         except Exception as e:
-            print(f"❌ Error saving file {safe_filename}: {e}")
+            logger.error("[ERR] Error saving file %s: %s", output_path.name, e)
+            self.discard_result_stream(stream)
             return False
     
+    def discard_result_stream(self, stream):
+        """Close and delete an unfinished result stream, leaving any earlier result in place"""
+        stream.close()
+        try:
+            os.remove(stream.name)
+        except FileNotFoundError:
+            pass
+    
     def load_discussion_from_file(self, filename: str) -> str:
         """Load discussion content from file with improved error handling"""
         file_path = self.base_dir / filename
         
         try:
-            if not file_path.exists():
-                print(f"❌ Discussion file not found: {file_path}")
-                return ""
-            
-            with open(file_path, "r", encoding="utf-8") as file:
-                content = file.read()
-                
-            if not content.strip():
-                print(f"⚠️  Discussion file is empty: {file_path}")
-                return ""
-                
-            print(f"✅ Loaded discussion from: {file_path}")
-            return content
-            
-        except UnicodeDecodeError:
-            try:
-                # Try different encoding
-                with open(file_path, "r", encoding="latin-1") as file:
-                    content = file.read()
-                print(f"✅ Loaded discussion with latin-1 encoding: {file_path}")
-                return content
-            except Exception as e:
-                print(f"❌ Error loading discussion file with alternative encoding: {e}")
-                return ""
+            # Read the bytes once; a non-UTF-8 file is re-decoded in memory rather than re-read
+            data = file_path.read_bytes()
+        except FileNotFoundError:
+            logger.error("[ERR] Discussion file not found: %s", file_path)
+            return ""
         except Exception as e:
-            print(f"❌ Error loading discussion file: {e}")
+            logger.error("[ERR] Error loading discussion file: %s", e)
+            return ""
+        
+        try:
+            content = data.decode("utf-8")
+            encoding_note = ""
+        except UnicodeDecodeError:
+            # Try different encoding (latin-1 accepts any byte sequence)
+            content = data.decode("latin-1")
+            encoding_note = " with latin-1 encoding"
+        
+        # Same newline translation as reading in text mode
+        if "\r" in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        
+        if not content.strip():
+            logger.warning("[WARN] Discussion file is empty: %s", file_path)
             return ""
+        
+        logger.info("[OK] Loaded discussion%s from: %s", encoding_note, file_path)
+        return content
     
     def save_log(self, log_content: str, log_name: str = None) -> bool:
         """Save log content with timestamp"""
@@ -178,10 +510,27 @@ class FileManager:
                 file.write(f"Process Log - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 file.write("=" * 60 + "\n\n")
                 file.write(log_content)
-            print(f"📝 Log saved to: {log_path}")
+            logger.info("[OK] Log saved to: %s", log_path)
             return True
         except Exception as e:
-            print(f"❌ Error saving log: {e}")
+            logger.error("[ERR] Error saving log: %s", e)
+            return False
+    
+    def save_log_records(self, records: Iterable[str], log_name: str = None) -> bool:
+        """Stream JSON-lines log records to a timestamped .jsonl file"""
+        self.ensure_directories()
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        log_path = self.logs_dir / f"{log_name or 'process_log'}_{timestamp}.jsonl"
+        
+        try:
+            with open(log_path, "w", encoding="utf-8") as file:
+                for record in records:
+                    file.write(record + "\n")
+            logger.info("[OK] Log saved to: %s", log_path)
+            return True
+        except Exception as e:
+            logger.error("[ERR] Error saving log: %s", e)
             return False
 
 class ValidationTools:
@@ -198,109 +547,368 @@ class ValidationTools:
                 missing_vars.append(var)
         
         if missing_vars:
-            print(f"❌ Missing required environment variables: {', '.join(missing_vars)}")
-            print("💡 Please set these variables in your .env file or environment:")
+            logger.error("[ERR] Missing required environment variables: %s", ", ".join(missing_vars))
+            logger.error("[ERR] Please set these variables in your .env file or environment:")
             for var in missing_vars:
-                print(f"   {var}=your_api_key_here")
+                logger.error("   %s=your_api_key_here", var)
             return False
         
         # Validate API key format (basic check)
         api_key = os.getenv("GOOGLE_API_KEY")
         if api_key and len(api_key.strip()) < 10:
-            print("⚠️  Warning: GOOGLE_API_KEY seems too short. Please verify it's correct.")
+            logger.warning("[WARN] GOOGLE_API_KEY seems too short. Please verify it's correct.")
         
-        print("✅ Environment validation passed")
+        logger.info("[OK] Environment validation passed")
         return True
     
     @staticmethod
     def validate_agent_response(response: str, agent_name: str) -> bool:
         """Validate that agent response is not empty and meaningful"""
         if not response or not response.strip():
-            print(f"❌ Warning: {agent_name} returned empty response")
+            logger.warning("[WARN] %s returned empty response", agent_name)
             return False
         
         if len(response.strip()) < 10:
-            print(f"⚠️  Warning: {agent_name} returned very short response: '{response.strip()}'")
+            logger.warning("[WARN] %s returned very short response: '%s'", agent_name, response.strip())
             return False
         
-        print(f"✅ {agent_name} response validation passed")
+        logger.info("[OK] %s response validation passed", agent_name)
         return True
     
     @staticmethod
     def validate_crew_result(result: Any) -> bool:
         """Validate crew execution result"""
         if result is None:
-            print("❌ Crew returned None result")
+            logger.error("[ERR] Crew returned None result")
             return False
         
         result_str = str(result).strip()
         if not result_str:
-            print("❌ Crew returned empty result")
+            logger.error("[ERR] Crew returned empty result")
             return False
         
         if len(result_str) < 50:
-            print(f"⚠️  Warning: Crew returned very short result: '{result_str[:100]}...'")
+            logger.warning("[WARN] Crew returned very short result: '%s...'", result_str[:100])
         
         return True
 
+class _LazyEntry:
+    """A log entry passed to the logger as a %s argument, rendered only if a handler emits it"""
+    
+    __slots__ = ("fields",)
+    
+    def __init__(self, *fields):
+        self.fields = fields
+    
+    def __str__(self) -> str:
+        return LoggingTools._render(*self.fields)
+
 class LoggingTools:
     """Enhanced logging utilities"""
     
-    _log_buffer = []
+    # Entries are buffered unformatted and rendered when the log is read or saved; they are
+    # also passed to the console logger, which renders them only when it shows them. Results
+    # keep only their preview text.
+    # With enabled = False (logs won't be saved) logging is a no-op.
+    enabled = True
+    # One deque per field, so an entry adds no tuple of its own; deques keep appends O(1)
+    # without the periodic list resize copies of a long batch run
+    _timestamps: Deque[float] = deque()
+    _categories: Deque[str] = deque()  # "step", "result" or "error"
+    _names: Deque[str] = deque()  # Step name, result title or error context
+    _texts: Deque[str] = deque()  # Step message (%-format string), result preview or error message
+    _args: Deque[tuple] = deque()  # Step message arguments; the shared empty tuple otherwise
+    # Entries come from the event loop and asyncio.to_thread workers at once; the lock keeps
+    # an entry's fields in the same row of every column
+    _lock = threading.Lock()
     
     @staticmethod
-    def log_step(step_name: str, message: str = ""):
-        """Log a processing step"""
+    def _append(category: str, name: str, text: str, args: tuple = ()):
+        timestamp = time.time()
+        with LoggingTools._lock:
+            LoggingTools._timestamps.append(timestamp)
+            LoggingTools._categories.append(category)
+            LoggingTools._names.append(name)
+            LoggingTools._texts.append(text)
+            LoggingTools._args.append(args)
+    
+    @staticmethod
+    def _snapshot() -> tuple:
+        # Copies of the columns, so readers never iterate a deque another thread is appending to
+        with LoggingTools._lock:
+            return (list(LoggingTools._timestamps), list(LoggingTools._categories), list(LoggingTools._names),
+                    list(LoggingTools._texts), list(LoggingTools._args))
+    
+    @staticmethod
+    def log_step(step_name: str, message: str = "", *args):
+        """Log a processing step; ``message`` is a %-format string rendered lazily with ``args``"""
+        if LoggingTools.enabled:
+            LoggingTools._append("step", step_name, message, args)
+            logger.info("%s", _LazyEntry("step", step_name, message, args))
+    
+    @staticmethod
+    def log_result(title: str, content: Any, max_preview: int = 200):
+        """Log results with preview"""
+        if LoggingTools.enabled:
+            # Only the preview is buffered, never the whole discussion, dialogue or result dict
+            text = str(content) if content else ""
+            preview = text[:max_preview] + "..." if len(text) > max_preview else text
+            LoggingTools._append("result", title, preview)
+            logger.info("%s", _LazyEntry("result", title, preview, ()))
+    
+    @staticmethod
+    def log_error(error_msg: str, context: str = ""):
+        """Log error messages (always shown on the console)"""
+        logger.error("%s", _LazyEntry("error", context, error_msg, ()))
+        if LoggingTools.enabled:
+            LoggingTools._append("error", context, error_msg)
+    
+    @staticmethod
+    def _render_step(step_name: str, message: str, args: tuple) -> str:
         separator = "=" * 60
         log_entry = f"\n{separator}\nSTEP: {step_name}\n"
         if message:
-            log_entry += f"INFO: {message}\n"
-        log_entry += separator
-        
-        print(log_entry)
-        LoggingTools._log_buffer.append(log_entry)
+            log_entry += f"INFO: {message % args if args else message}\n"
+        return log_entry + separator
     
     @staticmethod
-    def log_result(title: str, content: str, max_preview: int = 200):
-        """Log results with preview"""
+    def _render_result(title: str, preview: str) -> str:
         log_entry = f"\n--- {title} ---\n"
         
-        if content:
-            preview = content[:max_preview] + "..." if len(content) > max_preview else content
+        if preview:
             log_entry += f"{preview}\n"
         else:
             log_entry += "No content\n"
         
-        log_entry += f"--- End {title} ---\n"
-        
-        print(log_entry)
-        LoggingTools._log_buffer.append(log_entry)
+        return log_entry + f"--- End {title} ---\n"
     
     @staticmethod
-    def log_error(error_msg: str, context: str = ""):
-        """Log error messages"""
-        log_entry = f"\n❌ ERROR"
+    def _render_error(error_msg: str, context: str) -> str:
+        log_entry = f"\n[ERR] ERROR"
         if context:
             log_entry += f" in {context}"
-        log_entry += f": {error_msg}\n"
-        
-        print(log_entry)
-        LoggingTools._log_buffer.append(log_entry)
+        return log_entry + f": {error_msg}\n"
+    
+    @staticmethod
+    def _render(category: str, name: str, text: str, args: tuple) -> str:
+        if category == "step":
+            return LoggingTools._render_step(name, text, args)
+        if category == "result":
+            return LoggingTools._render_result(name, text)
+        return LoggingTools._render_error(text, name)
+    
+    @staticmethod
+    def _fields(category: str, name: str, text: str, args: tuple) -> Dict[str, Any]:
+        """Structured fields of an entry for the JSON-lines log"""
+        if category == "step":
+            return {"step": name, "message": text % args if args else text}
+        if category == "result":
+            return {"title": name, "preview": text}
+        return {"error": text, "context": name}
+    
+    @staticmethod
+    def first_timestamp() -> Optional[float]:
+        """Get the time of the first buffered entry"""
+        with LoggingTools._lock:
+            return LoggingTools._timestamps[0] if LoggingTools._timestamps else None
     
     @staticmethod
     def get_full_log() -> str:
         """Get complete log as string"""
-        return "\n".join(LoggingTools._log_buffer)
+        _, categories, names, texts, args = LoggingTools._snapshot()
+        return "\n".join(map(LoggingTools._render, categories, names, texts, args))
+    
+    @staticmethod
+    def iter_log_records():
+        """Yield one JSON line per buffered entry"""
+        for timestamp, category, name, text, args in zip(*LoggingTools._snapshot()):
+            yield json.dumps({"timestamp": timestamp, "category": category,
+                              **LoggingTools._fields(category, name, text, args)}, default=str)
     
     @staticmethod
     def clear_log():
         """Clear the log buffer"""
-        LoggingTools._log_buffer.clear()
+        with LoggingTools._lock:
+            LoggingTools._timestamps.clear()
+            LoggingTools._categories.clear()
+            LoggingTools._names.clear()
+            LoggingTools._texts.clear()
+            LoggingTools._args.clear()
     
     @staticmethod
     def save_log_to_file(file_manager: FileManager) -> bool:
-        """Save complete log to file"""
-        if LoggingTools._log_buffer:
-            full_log = LoggingTools.get_full_log()
-            return file_manager.save_log(full_log, "newsgroup_processing")
-        return False
\ No newline at end of file
+        """Save complete log to a JSON-lines file"""
+        if LoggingTools._timestamps:
+            return file_manager.save_log_records(LoggingTools.iter_log_records(), "newsgroup_processing")
+        return False
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache"""
+    
+    def get(self, key: str) -> Optional[Any]: ...
+    
+    def set(self, key: str, value: Any) -> None: ...
+
+class MemoryCacheBackend:
+    """In-process cache backend, cleared when the process exits"""
+    
+    def __init__(self):
+        self._store: Dict[str, Any] = {}
+    
+    def get(self, key: str) -> Optional[Any]:
+        return self._store.get(key)
+    
+    def set(self, key: str, value: Any) -> None:
+        self._store[key] = value
+
+class FileCacheBackend:
+    """Append-only JSON-lines cache backend that persists between runs"""
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._store: Optional[Dict[str, Any]] = None
+        self._torn_tail = False  # The file ends in a partial line, which the next write must not extend
+        # Crews read and write from asyncio.to_thread workers
+        self._lock = threading.Lock()
+    
+    def _load(self) -> Dict[str, Any]:
+        if self._store is None:
+            self._store = {}
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        self._torn_tail = not line.endswith("\n")
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue  # A write cut short by a crash; the entry is just recomputed
+                        self._store[entry["key"]] = entry["value"]
+            except FileNotFoundError:
+                pass
+        return self._store
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._load().get(key)
+    
+    def set(self, key: str, value: Any) -> None:
+        # Each entry is one appended line, so a write never rewrites or truncates earlier ones
+        line = json.dumps({"key": key, "value": value}) + "\n"
+        with self._lock:
+            self._load()[key] = value
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write("\n" + line if self._torn_tail else line)
+                self._torn_tail = False
+            except Exception as e:
+                logger.warning("[WARN] Could not write cache file %s: %s", self.path, e)
+
+class LLMCache:
+    """Cache of agent responses keyed by pipeline stage, model and input content"""
+    
+    def __init__(self, backend: Optional[CacheBackend] = None, similarity_threshold: float = 0.92,
+                 semantic_path: Optional[Path] = None):
+        self.backend = backend or MemoryCacheBackend()
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self.semantic_hits = 0
+        # Semantic index: one unit-normalized embedding row per stored result. With a
+        # semantic_path it is loaded here and written back by save_semantic_index
+        self.semantic_path = Path(semantic_path) if semantic_path else None
+        self._vectors: Optional[np.ndarray] = None
+        self._semantic_results: List[Dict[str, Any]] = []
+        self._semantic_dirty = False
+        if self.semantic_path:
+            self._load_semantic_index()
+    
+    @staticmethod
+    def make_key(stage: str, model: str, content: str) -> str:
+        """Build a stable cache key for a stage input"""
+        payload = json.dumps({"stage": stage, "model": model, "content": content}, sort_keys=True)
+        # blake2b is faster than sha256 and a 128-bit digest is plenty for cache keys
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def get(self, stage: str, model: str, content: str) -> Optional[Any]:
+        """Return the cached response for a stage input, or None on a miss"""
+        value = self.backend.get(self.make_key(stage, model, content))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    def contains(self, stage: str, model: str, content: str) -> bool:
+        """Check for a cached response without counting a hit or miss"""
+        return self.backend.get(self.make_key(stage, model, content)) is not None
+    
+    def set(self, stage: str, model: str, content: str, value: Any) -> None:
+        """Store a stage response"""
+        self.backend.set(self.make_key(stage, model, content), value)
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def semantic_lookup(self, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Return the stored result whose input is most similar, if above the threshold"""
+        if self._vectors is None or self._vectors.shape[1] != len(embedding):
+            return None
+        
+        similarities = self._vectors @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        
+        self.semantic_hits += 1
+        return self._semantic_results[best]
+    
+    def semantic_store(self, embedding: List[float], result: Dict[str, Any]) -> None:
+        """Index a result under the embedding of its input"""
+        vector = self._normalize(embedding)[np.newaxis, :]
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[1]:
+            # First entry, or a different embedding model than the saved index was built with
+            self._vectors, self._semantic_results = vector, [result]
+        else:
+            self._vectors = np.vstack([self._vectors, vector])
+            self._semantic_results.append(result)
+        self._semantic_dirty = True
+    
+    def _load_semantic_index(self):
+        try:
+            with np.load(self.semantic_path) as index:
+                vectors, results = index["vectors"], index["results"]
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("[WARN] Could not read semantic index %s: %s", self.semantic_path, e)
+            return
+        
+        self._vectors = vectors.astype(np.float32)
+        self._semantic_results = [json.loads(str(result)) for result in results]
+    
+    def save_semantic_index(self) -> bool:
+        """Write new semantic index entries to semantic_path, replacing the previous file in one step"""
+        if self.semantic_path is None or not self._semantic_dirty:
+            return False
+        
+        try:
+            self.semantic_path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.semantic_path.parent, prefix=f".{self.semantic_path.name}.",
+                                             suffix=".part", delete=False) as file:
+                np.savez(file, vectors=self._vectors,
+                         results=np.array([json.dumps(result) for result in self._semantic_results]))
+            os.replace(file.name, self.semantic_path)
+        except Exception as e:
+            logger.warning("[WARN] Could not write semantic index %s: %s", self.semantic_path, e)
+            return False
+        
+        self._semantic_dirty = False
+        return True
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters"""
+        return {"hits": self.hits, "misses": self.misses, "semantic_hits": self.semantic_hits}
\ No newline at end of file